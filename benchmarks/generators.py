@@ -0,0 +1,282 @@
+"""Seeded generators of synthetic bank exports.
+
+Each generator writes a document of the given number of rows in the
+format of one of the supported exports, with a mix of transaction
+types resembling a real account: mostly card payments and iDEAL
+purchases, some direct debits and transfers, the occasional cash
+withdrawal. The same seed always gives the same document.
+"""
+import csv
+import datetime
+import random
+
+
+# First booking date of the generated documents.
+START = datetime.date(2015, 1, 1)
+
+# Maximum time span of the generated documents, in years.
+YEARS = 10
+
+SHOPS = ['Albert Heijn', 'Jumbo', 'HEMA', 'Bol.com', 'Coolblue', 'NS Reizigers',
+         'Shell', 'Kruidvat', 'IKEA', 'Thuisbezorgd.nl', 'Action', 'Gamma']
+PEOPLE = ['J. de Vries', 'A. Jansen', 'M. Bakker', 'S. Visser', 'P. Smit', 'L. Meijer']
+CITIES = ['AMSTERDAM', 'UTRECHT', 'ROTTERDAM', 'DEN HAAG', 'EINDHOVEN']
+DEBITS = ['Eneco', 'Vattenfall', 'Ziggo', 'KPN', 'Zilveren Kruis', 'Belastingdienst']
+
+
+def _dates(rng, count, reverse=False):
+    """Booking dates, a few transactions per day in increasing order.
+
+    Large documents get more transactions per day, so that they span
+    at most about YEARS years. With reverse the dates decrease, for
+    the exports listing the newest transaction first.
+    """
+    rate = min(0.4, YEARS * 365 / count)
+    step = datetime.timedelta(days=-1 if reverse else 1)
+    date = START - step * round(count * rate) if reverse else START
+    for _ in range(count):
+        if rng.random() < rate:
+            date += step
+        yield date
+
+
+def _amount(rng, low=1, high=20000):
+    return rng.randint(low, high) / 100
+
+
+def _pick(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _write(filepath, header, rows, encoding='utf-8', **fmtparams):
+    with open(filepath, 'w', newline='', encoding=encoding) as fd:
+        writer = csv.writer(fd, **fmtparams)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def ing(filepath, count, seed=0):
+    """ING export, semicolon separated, newest transaction first."""
+    rng = random.Random(seed)
+    types = {'Payment terminal': 50, 'iDEAL': 20, 'SEPA direct debit': 10,
+             'Online Banking': 10, 'Transfer': 6, 'Batch payment': 2, 'Various': 2}
+    def rows():
+        for i, date in enumerate(_dates(rng, count, reverse=True)):
+            kind = _pick(rng, types)
+            debit = kind != 'Transfer' or rng.random() < 0.5
+            if kind == 'Payment terminal':
+                shop = rng.choice(SHOPS)
+                name = f'{shop} {rng.choice(CITIES)}'
+                notifications = (f'Card sequence no.: 001 {date:%d/%m/%Y} 12:{i % 60:02d} '
+                                 f'Transaction: {i:08d} Term: CT{i % 1000:04d} Apple Pay '
+                                 f'Value date: {date:%d/%m/%Y}')
+            elif kind == 'Online Banking' and rng.random() < 0.5:
+                name = rng.choice(PEOPLE)
+                notifications = f'To Savings account {i % 97} Value date: {date:%d/%m/%Y}'
+            elif kind == 'Various':
+                name = 'Kosten OranjePakket'
+                notifications = f'Periode {date:%m/%Y}'
+            else:
+                name = rng.choice(SHOPS if kind == 'iDEAL' else DEBITS + PEOPLE)
+                notifications = (f'Name: {name} Description: {name} {rng.randint(1000, 99999)} '
+                                 f'order {i} IBAN: NL{i % 100:02d}INGB000{i % 10000:06d} '
+                                 f'Reference: {date:%d-%m-%Y} {i} Value date: {date:%d/%m/%Y}')
+            amount = f'{_amount(rng):.2f}'.replace('.', ',')
+            yield [f'{date:%Y%m%d}', name, 'NL00INGB0001234567', f'NL{i % 100:02d}INGB',
+                   'GT', 'Debit' if debit else 'Credit', amount, kind, notifications,
+                   '1234,56', '']
+    _write(filepath, ['Date', 'Name / Description', 'Account', 'Counterparty', 'Code',
+                      'Debit/credit', 'Amount (EUR)', 'Transaction type', 'Notifications',
+                      'Resulting balance', 'Tag'],
+           rows(), delimiter=';', quoting=csv.QUOTE_ALL, lineterminator='\n')
+
+
+def abn(filepath, count, seed=0):
+    """ABN AMRO export, semicolon separated, fixed width descriptions."""
+    rng = random.Random(seed)
+    kinds = {'BEA': 55, 'SEPA': 20, 'TRTP': 20, 'ABN': 5}
+    def rows():
+        for i, date in enumerate(_dates(rng, count)):
+            kind = _pick(rng, kinds)
+            if kind == 'BEA':
+                description = (f'BEA, Betaalpas                   {rng.choice(SHOPS)} {i % 9999},PAS{i % 999:03d}'
+                               f'       NR:{i:08d}, {date:%d.%m.%y}/12:00       {rng.choice(CITIES)}')
+            elif kind == 'SEPA':
+                description = (f'SEPA Overboeking                 IBAN: NL12ABNA0123456789        '
+                               f'BIC: ABNANL2A                    Naam: {rng.choice(PEOPLE)}'
+                               f'                      Omschrijving: Terugbetaling {i}       Kenmerk: {i}')
+            elif kind == 'TRTP':
+                description = (f'/TRTP/SEPA Incasso algemeen doorlopend/CSID/NL00ZZZ{i % 1000:03d}'
+                               f'/NAME/{rng.choice(DEBITS)}/MARF/{i}/REMI/Termijn {date:%m-%Y}'
+                               f'/IBAN/NL02RABO0123456789/BIC/RABONL2U/EREF/E{i}')
+            else:
+                description = 'ABN AMRO Bank N.V.               Basic package                   2,95'
+            amount = f'-{_amount(rng):.2f}'.replace('.', ',')
+            yield ['123456789', 'EUR', f'{date:%Y%m%d}', f'{date:%Y%m%d}',
+                   '1000,00', '900,00', amount, description]
+    _write(filepath, ['Rekeningnummer', 'Muntsoort', 'Transactiedatum', 'Rentedatum',
+                      'Beginsaldo', 'Eindsaldo', 'Transactiebedrag', 'Omschrijving'],
+           rows(), delimiter=';', lineterminator='\r\n')
+
+
+def amex(filepath, count, seed=0):
+    """American Express export, comma separated, US dates."""
+    rng = random.Random(seed)
+    def rows():
+        for i, date in enumerate(_dates(rng, count)):
+            amount = f'{_amount(rng):.2f}'.replace('.', ',')
+            yield [f'{date:%m/%d/%Y}', f'{rng.choice(SHOPS).upper()} {rng.choice(CITIES)}',
+                   amount, '', '', '', '', '', '', f'AT{i:012d}']
+    _write(filepath, ['Datum', 'Omschrijving', 'Bedrag', 'Aanvullende informatie',
+                      'Vermeld op uw rekeningoverzicht als', 'Adres', 'Plaats', 'Postcode',
+                      'Land', 'Referentie'],
+           rows(), lineterminator='\r\n')
+
+
+def revolut(filepath, count, seed=0):
+    """Revolut export, comma separated."""
+    rng = random.Random(seed)
+    types = {'CARD_PAYMENT': 70, 'TRANSFER': 15, 'TOPUP': 10, 'EXCHANGE': 5}
+    def rows():
+        for i, date in enumerate(_dates(rng, count)):
+            kind = _pick(rng, types)
+            if kind == 'TRANSFER':
+                description, reference = f'Aan {rng.choice(PEOPLE)}', f'Terugbetaling {i}'
+            elif kind == 'TOPUP':
+                description, reference = f'Geld toegevoegd van {rng.choice(PEOPLE)}', f'Top-up {i}'
+            else:
+                description, reference = rng.choice(SHOPS), ''
+            sign = '' if kind == 'TOPUP' else '-'
+            yield [f'{date:%Y-%m-%d}', f'{date:%Y-%m-%d}', f'id{i:010d}', kind, description,
+                   reference, '', '', 'EUR', '1', 'EUR', f'{sign}{_amount(rng):.2f}', '0.00',
+                   '100.00', 'EUR Main', '', '', '', '']
+    _write(filepath, ['Date started (UTC)', 'Date completed (UTC)', 'ID', 'Type', 'Description',
+                      'Reference', 'Payer', 'Card number', 'Orig currency', 'Orig amount',
+                      'Payment currency', 'Amount', 'Fee', 'Balance', 'Account',
+                      'Beneficiary account number', 'Beneficiary sort code or routing number',
+                      'Beneficiary IBAN', 'Beneficiary BIC'],
+           rows(), lineterminator='\r\n')
+
+
+# Columns of the csv-grabber exports.
+GRABBER_HEADER = ['id', 'date', 'amount', 'currency', 'payee', 'narration', 'bankTransactionCode']
+
+
+def _grabber(filepath, rows):
+    _write(filepath, GRABBER_HEADER, rows, lineterminator='\n')
+
+
+def _ing_grabber_rows(rng, count):
+    types = {'Betaalautomaat': 50, 'iDEAL': 20, 'Incasso': 10, 'Online bankieren': 10,
+             'Overschrijving': 5, 'Diversen': 3, 'Geldautomaat': 2}
+    for i, date in enumerate(_dates(rng, count)):
+        kind = _pick(rng, types)
+        payee = rng.choice(SHOPS if kind in ('Betaalautomaat', 'iDEAL') else DEBITS + PEOPLE)
+        if kind in ('iDEAL', 'Incasso', 'Online bankieren', 'Overschrijving'):
+            narration = (f'Naam: {payee}<br>Omschrijving: {payee} {i} order {i}'
+                         f'<br>IBAN: NL{i % 100:02d}INGB000{i % 10000:06d}<br>Kenmerk: {i}'
+                         f'<br>Valutadatum: {date:%d-%m-%Y}')
+        elif kind == 'Betaalautomaat':
+            narration = f'Pasvolgnr: 001 {date:%d-%m-%Y} 12:00 Transactie: {i:08d}'
+        else:
+            narration = (f'{payee} {rng.choice(CITIES)}<br>Datum/Tijd: {date:%d-%m-%Y} 12:00'
+                         f'<br>Valutadatum: {date:%d-%m-%Y}')
+        yield [f'ing{i:010d}', f'{date:%Y-%m-%d}', f'-{_amount(rng):.2f}', 'EUR',
+               payee, narration, kind]
+
+
+def ing_grabber(filepath, count, seed=0):
+    """GoCardless export of an ING account, in the csv-grabber dialect."""
+    _grabber(filepath, _ing_grabber_rows(random.Random(seed), count))
+
+
+def _abn_grabber_rows(rng, count, bea_code, codes):
+    for i, date in enumerate(_dates(rng, count)):
+        code = _pick(rng, codes)
+        shop = rng.choice(SHOPS)
+        if code == bea_code:
+            narration = (f'BEA, Apple Pay\n{shop} {i % 999},PAS{i % 999:03d}\n'
+                         f'NR:{i:08d} {date:%d.%m.%y}\n{rng.choice(CITIES)}')
+        elif code in ('944', '411'):
+            narration = (f'SEPA Overboeking\nIBAN: NL12ABNA0123456789\nNaam: {shop}\n'
+                         f'Omschrijving: Bestelling {i}\n {date:%d-%m-%Y}\nKenmerk: {i}')
+        elif code == '526':
+            narration = f'{rng.choice(DEBITS)}  B.V.\nTermijn  {date:%m-%Y}'
+        elif code == '426':
+            narration = f'Apple Pay\n{shop}\n{rng.choice(CITIES)}'
+        elif code == '445':
+            narration = f'GEA, Geldautomaat {i % 999}\n{rng.choice(CITIES)}'
+        else:
+            narration = f'Overschrijving\n{rng.choice(PEOPLE)}'
+        yield [f'abn{i:010d}', f'{date:%Y-%m-%d}', f'-{_amount(rng):.2f}', 'EUR',
+               shop, narration, code]
+
+
+# Bank transaction codes of the ABN AMRO accounts, the card payment
+# first, with their weights.
+ABN_CODES = {'999': 50, '944': 20, '526': 10, '426': 10, '411': 5, '445': 5}
+ABN_BV_CODES = {'247': 50, '944': 20, '526': 10, '426': 10, '658': 5, '445': 5}
+
+
+def abn_grabber(filepath, count, seed=0):
+    """GoCardless export of a personal ABN AMRO account."""
+    _grabber(filepath, _abn_grabber_rows(random.Random(seed), count, '999', ABN_CODES))
+
+
+def abn_bv_grabber(filepath, count, seed=0):
+    """GoCardless export of a business ABN AMRO account."""
+    _grabber(filepath, _abn_grabber_rows(random.Random(seed), count, '247', ABN_BV_CODES))
+
+
+def _revolut_grabber_rows(rng, count):
+    for i, date in enumerate(_dates(rng, count)):
+        if rng.random() < 0.15:
+            payee, narration, kind = rng.choice(PEOPLE), 'Top-up\nfrom Apple Pay', 'TOPUP'
+        else:
+            payee = rng.choice(SHOPS)
+            narration, kind = payee, 'CARD_PAYMENT'
+        yield [f'rev{i:010d}', f'{date:%Y-%m-%d}', f'-{_amount(rng):.2f}', 'EUR',
+               payee, narration, kind]
+
+
+def revolut_grabber(filepath, count, seed=0):
+    """GoCardless export of a Revolut account."""
+    _grabber(filepath, _revolut_grabber_rows(random.Random(seed), count))
+
+
+def grabber(filepath, count, seed=0):
+    """Combined csv-grabber export of all accounts, with an account column.
+
+    The rows of each account are the rows of its own export, in the
+    order of their dates, interleaved at random.
+    """
+    rng = random.Random(seed)
+    accounts = {
+        'Assets.NL.ING.Checking': _ing_grabber_rows(random.Random(rng.random()), count),
+        'Assets.NL.ABN.Gezamelijk': _abn_grabber_rows(random.Random(rng.random()), count,
+                                                      '999', ABN_CODES),
+        'Assets.BV.ABN.Checking': _abn_grabber_rows(random.Random(rng.random()), count,
+                                                    '247', ABN_BV_CODES),
+        'Assets.NL.Revolut': _revolut_grabber_rows(random.Random(rng.random()), count),
+        'Assets.BV.Revolut': _revolut_grabber_rows(random.Random(rng.random()), count),
+    }
+    def rows():
+        for _ in range(count):
+            account = rng.choice(list(accounts))
+            yield next(accounts[account]) + [account]
+    _write(filepath, GRABBER_HEADER + ['account'], rows(), lineterminator='\n')
+
+
+# Generator and document name of each supported export format.
+FORMATS = {
+    'ing': (ing, 'ing.csv'),
+    'abn': (abn, 'abn.csv'),
+    'amex': (amex, 'amex.csv'),
+    'revolut': (revolut, 'revolut.csv'),
+    'ing_grabber': (ing_grabber, 'Assets.NL.ING.Checking.grabber.csv'),
+    'abn_grabber': (abn_grabber, 'Assets.NL.ABN.Gezamelijk.grabber.csv'),
+    'abn_bv_grabber': (abn_bv_grabber, 'Assets.BV.ABN.Checking.grabber.csv'),
+    'revolut_grabber': (revolut_grabber, 'Assets.NL.Revolut.grabber.csv'),
+    'revolut_bv_grabber': (revolut_grabber, 'Assets.BV.Revolut.grabber.csv'),
+    'grabber': (grabber, 'grabber.csv'),
+}
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Throughput benchmark of the importers on synthetic exports.
+
+Generates a document in each supported format with the seeded
+generators in generators.py, for each of the requested sizes, and
+measures the identify and extract steps of the importer handling it
+and the clean_up stages of import.py over the extracted entries. Each
+step is timed once, then run again under tracemalloc for its peak
+memory. The results are printed and written as JSON to --output, and
+compared to the results of an earlier run given with --baseline.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import generators
+from importers import signatures
+from ingest.pipeline import Pipeline
+
+
+# Default number of rows of the generated documents.
+SIZES = [1000, 100000]
+
+
+def measure(func):
+    """Return the result, time and peak memory of a function call."""
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    del result
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run(config, fmt, rows, directory, seed):
+    """Benchmark the importer of one format on a document of some rows."""
+    generate, filename = generators.FORMATS[fmt]
+    # The grabber exports are identified by their name, it is kept as is.
+    filepath = os.path.join(directory, filename)
+    generate(filepath, rows, seed=seed)
+
+    def identify():
+        signatures._identify.cache_clear()
+        return [importer for importer in config['importers'] if importer.identify(filepath)]
+
+    found, seconds, peak = measure(identify)
+    if len(found) != 1:
+        raise RuntimeError(f'{filepath} identified by {len(found)} importers')
+    importer = found[0]
+    yield 'identify', importer, seconds, peak
+
+    entries, seconds, peak = measure(lambda: importer.extract(filepath, []))
+    yield 'extract', importer, seconds, peak
+
+    pipeline = Pipeline(*config['clean_up'])
+    _, seconds, peak = measure(lambda: list(pipeline.run(entries)))
+    yield 'clean_up', importer, seconds, peak
+
+    os.unlink(filepath)
+
+
+def _revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=SIZES, help='Comma separated numbers of rows, e.g. 1000,100000,1000000.')
+    parser.add_argument('--formats', type=lambda value: value.split(','),
+                        default=list(generators.FORMATS), help='Comma separated export formats.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generators.')
+    parser.add_argument('--output', '-o', default='import_throughput.json',
+                        help='File to write the JSON results to.')
+    parser.add_argument('--baseline', '-b', help='Results of an earlier run to compare with.')
+    args = parser.parse_args()
+
+    config = runpy.run_path(os.path.join(ROOT, 'import.py'))
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as fd:
+            for result in json.load(fd)['results']:
+                baseline[(result['format'], result['rows'], result['phase'])] = result
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.sizes:
+            for fmt in args.formats:
+                for phase, importer, seconds, peak in run(config, fmt, rows, directory, args.seed):
+                    result = {
+                        'format': fmt,
+                        'importer': importer.name,
+                        'rows': rows,
+                        'phase': phase,
+                        'seconds': seconds,
+                        'rows_per_sec': rows / seconds if seconds else None,
+                        'peak_bytes': peak,
+                    }
+                    results.append(result)
+                    line = (f'{fmt:20} {rows:>8} {phase:9} {seconds:9.3f} s '
+                            f'{result["rows_per_sec"] or 0:>12,.0f} rows/s {peak / 2**20:9.1f} MiB')
+                    previous = baseline.get((fmt, rows, phase))
+                    if previous and previous['rows_per_sec'] and result['rows_per_sec']:
+                        line += f'  x{result["rows_per_sec"] / previous["rows_per_sec"]:.2f}'
+                    print(line, flush=True)
+
+    with open(args.output, 'w') as fd:
+        json.dump({
+            'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'revision': _revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'results': results,
+        }, fd, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Worst-case input benchmark for the ING narration parsers.
+
+Times each parser on adversarial inputs that never match: long runs of
+the separators the old greedy patterns backtracked over. The input
+size grows by FACTOR between the two measurements, so a linear time
+parser slows down by about FACTOR while a backtracking one slows down
+by FACTOR squared or worse. Exits with a non-zero status when any
+parser grows faster than MAX_GROWTH.
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from importers import ing, ing_from_grabber
+
+
+# Number of repetitions of the adversarial pattern in the small input.
+SIZE = 2000
+
+# Growth of the input size between the two measurements.
+FACTOR = 8
+
+# Maximum slowdown accepted for an input FACTOR times as large.
+MAX_GROWTH = 3 * FACTOR
+
+CASES = [
+    ('ing Name/Description',
+     lambda n: (ing._parseIngNarration, ('iDEAL', 'name', 'Name: ' + 'Description: x ' * n))),
+    ('ing From/To',
+     lambda n: (ing._parseIngNarration, ('Online Banking', 'name', 'To ' + 'x ' * n))),
+    ('ing_from_grabber Naam/Omschrijving',
+     lambda n: (ing_from_grabber._parseIngNarration, ('iDEAL', 'Naam: ' + '<br>Omschrijving:' * n + '<br>IBAN: x'))),
+    ('ing_from_grabber Valutadatum',
+     lambda n: (ing_from_grabber._parseIngNarration, ('Diversen', 'x<br>Datum/Tijd:' * n))),
+]
+
+
+def measure(case, size, repeat=5):
+    """Return the best time of a parser call on an input of the given size."""
+    parser, args = case(size)
+    # Bypass the memo, it would turn all but the first call into a lookup.
+    parser = parser.__wrapped__
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            parser(*args)
+        except Exception:
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    failed = False
+    for name, case in CASES:
+        small = measure(case, SIZE)
+        large = measure(case, SIZE * FACTOR)
+        growth = large / small
+        status = 'OK' if growth <= MAX_GROWTH else 'FAIL'
+        failed |= status == 'FAIL'
+        print(f'{name:40} {small * 1e3:8.3f} ms {large * 1e3:8.3f} ms  x{growth:6.1f}  {status}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
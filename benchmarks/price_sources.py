@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Latency and throughput benchmark of the price sources.
+
+Fetches the latest price of a ticker of each source from the local
+stand-in of quoteserver.py, first one request at a time and then from
+a pool of threads, and reports the quotes per second and the latency
+percentiles of Source.get_latest_price for both, with the faults given
+on the command line injected by the server. The quote caches and the
+rate limiter state are kept in a temporary directory, the caches with
+no minimum time to live, so every call goes to the server and parses
+its response. The results are printed and written as JSON to --output,
+and compared to the results of an earlier run given with --baseline.
+Exits with a non-zero status when a source returns a wrong price.
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent import futures
+from decimal import Decimal
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'pythonpackages'))
+
+from mypricesources import alphavantage, fetch, ft, morningstar, quotecache, ratelimit
+from quoteserver import QuoteServer, URLS
+
+
+# The benchmarked sources: a name, the source module, a ticker and the
+# price of the recorded response.
+CASES = [
+    ('alphavantage', alphavantage, 'price:IBM:USD', Decimal('249.87')),
+    ('alphavantage-fx', alphavantage, 'fx:USD:JPY', Decimal('148.642')),
+    ('ft', ft, 'IE00B4L5Y983', Decimal('112.35')),
+    ('morningstar', morningstar, 'F00000T1XT', Decimal('312.48')),
+]
+
+# Percentiles of the latency reported.
+PERCENTILES = [50, 95, 99]
+
+
+def configure(server, directory):
+    """Point the sources to the server and their state to a directory."""
+    for module in (alphavantage, ft, morningstar):
+        module.URL = server.url + URLS[module.__name__.rsplit('.', 1)[-1]]
+    # No quota, but the bookkeeping of one.
+    alphavantage._limiter = ratelimit.TokenBucket(
+        os.path.join(directory, 'alphavantage', 'ratelimit'), [(10**9, 1)])
+    ft._cache = quotecache.QuoteCache(os.path.join(directory, 'ft'), min_ttl=0)
+    morningstar._cache = quotecache.QuoteCache(os.path.join(directory, 'morningstar'), min_ttl=0)
+
+
+def measure(func, ticker, count, concurrency):
+    """Call a price fetching function count times for a ticker.
+
+    Returns:
+      The wall clock time of all calls and a list of (seconds, price)
+      pairs, one per call, with price None if the call failed.
+    """
+    def call(_):
+        start = time.perf_counter()
+        try:
+            price = func(ticker).price
+        except (ValueError, requests.RequestException):
+            price = None
+        return time.perf_counter() - start, price
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        calls = [call(index) for index in range(count)]
+    else:
+        with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            calls = list(executor.map(call, range(count)))
+    return time.perf_counter() - start, calls
+
+
+def percentile(values, percent):
+    """Return a percentile of a sorted list, by the nearest rank method."""
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def run(server, source, ticker, expected, count, concurrency):
+    """Benchmark a source at a concurrency, return the result as a dict."""
+    before = server.counts.copy()
+    seconds, calls = measure(source.get_latest_price, ticker, count, concurrency)
+    replies = server.counts - before
+    latencies = sorted(latency for latency, price in calls)
+    quotes = sum(price is not None for latency, price in calls)
+    result = {
+        'concurrency': concurrency,
+        'calls': count,
+        'quotes': quotes,
+        'errors': count - quotes,
+        'wrong': sum(price is not None and price != expected for latency, price in calls),
+        'requests': sum(replies.values()),
+        'notes': replies['note'],
+        'malformed': replies['malformed'],
+        'seconds': seconds,
+        'quotes_per_sec': quotes / seconds if seconds else None,
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}'] = percentile(latencies, percent)
+    result['max'] = latencies[-1]
+    return result
+
+
+def _revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sources', type=lambda value: value.split(','),
+                        default=[name for name, *_ in CASES], help='Comma separated sources.')
+    parser.add_argument('--calls', type=int, default=200,
+                        help='Number of calls per source and concurrency.')
+    parser.add_argument('--concurrency', type=int, default=fetch.MAX_WORKERS,
+                        help='Number of threads of the concurrent runs.')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Milliseconds each response is delayed.')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Maximum number of milliseconds randomly added to the latency.')
+    parser.add_argument('--note-rate', type=float, default=0.0,
+                        help='Fraction of the Alphavantage requests answered with a Note.')
+    parser.add_argument('--malformed-rate', type=float, default=0.0,
+                        help='Fraction of the responses broken off before their data.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random faults.')
+    parser.add_argument('--output', '-o', default='price_sources.json',
+                        help='File to write the JSON results to.')
+    parser.add_argument('--baseline', '-b', help='Results of an earlier run to compare with.')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as fd:
+            for result in json.load(fd)['results']:
+                baseline[(result['source'], result['concurrency'])] = result
+
+    results = []
+    server = QuoteServer(latency=args.latency / 1000, jitter=args.jitter / 1000,
+                         note_rate=args.note_rate, malformed_rate=args.malformed_rate,
+                         seed=args.seed)
+    with tempfile.TemporaryDirectory() as directory, server:
+        configure(server, directory)
+        for name, module, ticker, expected in CASES:
+            if name not in args.sources:
+                continue
+            source = module.Source()
+            # Connect and fill the caches of the parsers before timing.
+            measure(source.get_latest_price, ticker, 1, 1)
+            for concurrency in sorted({1, args.concurrency}):
+                result = {'source': name, 'ticker': ticker}
+                result.update(run(server, source, ticker, expected, args.calls, concurrency))
+                results.append(result)
+                line = (f'{name:16} x{concurrency:<3} '
+                        f'{result["quotes_per_sec"] or 0:>9,.1f} quotes/s'
+                        + ''.join(f' p{percent} {result[f"p{percent}"] * 1e3:8.2f} ms'
+                                  for percent in PERCENTILES)
+                        + f' {result["errors"]:>5} errors {result["requests"]:>6} requests')
+                previous = baseline.get((name, concurrency))
+                if previous and previous['quotes_per_sec'] and result['quotes_per_sec']:
+                    line += f'  x{result["quotes_per_sec"] / previous["quotes_per_sec"]:.2f}'
+                if result['wrong']:
+                    line += f'  {result["wrong"]} WRONG'
+                print(line, flush=True)
+
+    with open(args.output, 'w') as fd:
+        json.dump({
+            'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'revision': _revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'faults': {
+                'latency_ms': args.latency,
+                'jitter_ms': args.jitter,
+                'note_rate': args.note_rate,
+                'malformed_rate': args.malformed_rate,
+                'seed': args.seed,
+            },
+            'results': results,
+        }, fd, indent=2)
+    return 1 if any(result['wrong'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Benchmark of the FT and Morningstar quote page parsers.
+
+Parses the saved pages in fixtures/ with the streaming scanners of the
+price sources and with the BeautifulSoup tree the sources used before,
+and reports the time and the peak memory of both. Exits with a
+non-zero status when the two disagree on the price of a page.
+"""
+import os
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from bs4 import BeautifulSoup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'pythonpackages'))
+
+from beanprice import source
+from mypricesources import ft, morningstar
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def ft_soup(ticker, text):
+    """The BeautifulSoup based parser of the FT source."""
+    soup = BeautifulSoup(text, 'html.parser')
+    quote_bar = soup.find('ul', {'class': 'mod-tearsheet-overview__quote__bar'})
+    price_value = quote_bar.find('li').find('span', {'class': 'mod-ui-data-list__value'})
+    price = Decimal(price_value.text.strip())
+    disclaimer = soup.find('div', {'class': 'mod-disclaimer'})
+    date_match = re.search(r'as of ([A-Za-z]+ \d{2} \d{4})', disclaimer.text)
+    trade_time = datetime.strptime(date_match.group(1), '%b %d %Y').replace(tzinfo=timezone.utc)
+    return source.SourcePrice(price, trade_time, 'EUR')
+
+
+def morningstar_soup(ticker, text):
+    """The BeautifulSoup based parser of the Morningstar source."""
+    soup = BeautifulSoup(text, 'html.parser')
+    table = soup.find('table', {'class': 'overviewKeyStatsTable'})
+    price_cells = table.find_all('tr')[1].find_all('td')
+    date_match = re.search(r'(\d{2}-\d{2}-\d{4})', price_cells[0].text)
+    trade_time = datetime.strptime(date_match.group(1), '%d-%m-%Y').replace(tzinfo=timezone.utc)
+    currency_match = re.match(r'([A-Z]{3})\s*([\d,\.]+)', price_cells[2].text.strip())
+    price = Decimal(currency_match.group(2).replace(',', '.'))
+    return source.SourcePrice(price, trade_time, currency_match.group(1))
+
+
+CASES = [
+    ('ft_tearsheet.html', ft._parse, ft_soup),
+    ('morningstar_snapshot.html', morningstar._parse, morningstar_soup),
+]
+
+
+def measure(parser, text, repeat=10):
+    """Return the result, best time and peak memory of a parser call."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parser('TICKER', text)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    parser('TICKER', text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def main():
+    failed = False
+    for filename, parser, reference in CASES:
+        with open(os.path.join(FIXTURES, filename), encoding='utf-8') as fd:
+            text = fd.read()
+        for name, func in (('scanner', parser), ('soup', reference)):
+            result, seconds, peak = measure(func, text)
+            if name == 'scanner':
+                expected = result
+            status = 'OK' if result == expected else 'FAIL'
+            failed |= status == 'FAIL'
+            print(f'{filename:28} {name:8} {seconds * 1e3:8.2f} ms {peak / 1024:9.0f} KiB  {status}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Local stand-in for the sites the price sources fetch from.
+
+Replays the responses recorded in fixtures/ for the Alphavantage API
+and the FT and Morningstar quote pages, for any ticker, so the sources
+can be exercised without the network. Faults can be injected into the
+responses: a latency, with a random jitter, rate limit "Note" replies
+of the API and malformed responses, broken off before the data the
+sources look for.
+
+Run on its own it serves until interrupted and prints the URLs to set
+the URL constants of the sources to. The benchmarks start a QuoteServer
+in a thread instead.
+"""
+import argparse
+import collections
+import http.server
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# The URL constants of the sources, relative to the server.
+URLS = {
+    'alphavantage': '/query',
+    'ft': '/data/funds/tearsheet/summary?s={ticker}:eur',
+    'morningstar': '/nl/funds/snapshot/snapshot.aspx?id={ticker}',
+}
+
+# A recorded response: the fixture, its content type, the bytes before
+# which a malformed response breaks off and whether the site answers
+# with a Note when the quota is exhausted.
+Route = collections.namedtuple('Route', 'fixture content_type marker limited')
+
+# The recorded responses by path and Alphavantage function.
+ROUTES = {
+    ('/query', 'GLOBAL_QUOTE'): Route(
+        'alphavantage_global_quote.json', 'application/json', b'"05. price"', True),
+    ('/query', 'CURRENCY_EXCHANGE_RATE'): Route(
+        'alphavantage_exchange_rate.json', 'application/json', b'"5. Exchange Rate"', True),
+    ('/data/funds/tearsheet/summary', None): Route(
+        'ft_tearsheet.html', 'text/html; charset=utf-8', b'mod-tearsheet-overview__quote__bar',
+        False),
+    ('/nl/funds/snapshot/snapshot.aspx', None): Route(
+        'morningstar_snapshot.html', 'text/html; charset=utf-8', b'overviewKeyStatsTable', False),
+}
+
+# The reply of Alphavantage to the requests exceeding the quota.
+NOTE = (b'{\n    "Note": "Thank you for using Alpha Vantage! Our standard API call frequency is '
+        b'5 calls per minute and 25 calls per day."\n}')
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    # Keep the connections open, as the sites do, for the pooled session.
+    protocol_version = 'HTTP/1.1'
+    # Send the small responses at once, instead of waiting for the
+    # acknowledgement of the headers.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        status, content_type, body = self.server.reply(parts.path, parse_qs(parts.query))
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QuoteServer(http.server.ThreadingHTTPServer):
+    """A threaded HTTP server replaying the recorded responses.
+
+    Used as a context manager it serves from a thread of its own while
+    in the with block.
+
+    Args:
+      address: A (host, port) pair, by default a free port of localhost.
+      latency: Seconds each response is delayed.
+      jitter: Maximum number of seconds randomly added to the latency.
+      note_rate: Fraction of the API requests answered with a Note.
+      malformed_rate: Fraction of the responses broken off before their data.
+      seed: Seed of the random faults.
+    Attributes:
+      counts: A Counter of the responses sent, by the kind of response,
+        'ok', 'note', 'malformed' or 'missing'.
+    """
+
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0, jitter=0.0, note_rate=0.0,
+                 malformed_rate=0.0, seed=0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.note_rate = note_rate
+        self.malformed_rate = malformed_rate
+        self.counts = collections.Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies = {}
+        for route in ROUTES.values():
+            with open(os.path.join(FIXTURES, route.fixture), 'rb') as fd:
+                self._bodies[route.fixture] = fd.read()
+        self._thread = None
+
+    @property
+    def url(self):
+        """The base URL of the server."""
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _draw(self):
+        with self._lock:
+            return self._random.random(), self._random.random(), self._random.random()
+
+    def _count(self, kind):
+        with self._lock:
+            self.counts[kind] += 1
+
+    def reply(self, path, query):
+        """Return the status, content type and body of the response to a request."""
+        route = ROUTES.get((path, query.get('function', [None])[0]))
+        if route is None:
+            self._count('missing')
+            return 404, 'text/plain', b'Not Found'
+        delay, note, malformed = self._draw()
+        time.sleep(self.latency + delay * self.jitter)
+        body = self._bodies[route.fixture]
+        if route.limited and note < self.note_rate:
+            self._count('note')
+            return 200, route.content_type, NOTE
+        if malformed < self.malformed_rate:
+            self._count('malformed')
+            return 200, route.content_type, body[:body.index(route.marker)]
+        self._count('ok')
+        return 200, route.content_type, body
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self._thread.join()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on.')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on.')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Milliseconds each response is delayed.')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Maximum number of milliseconds randomly added to the latency.')
+    parser.add_argument('--note-rate', type=float, default=0.0,
+                        help='Fraction of the Alphavantage requests answered with a Note.')
+    parser.add_argument('--malformed-rate', type=float, default=0.0,
+                        help='Fraction of the responses broken off before their data.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random faults.')
+    args = parser.parse_args()
+
+    server = QuoteServer((args.host, args.port), args.latency / 1000, args.jitter / 1000,
+                         args.note_rate, args.malformed_rate, args.seed)
+    for name, url in URLS.items():
+        print(f'{name}.URL = {server.url + url!r}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(', '.join(f'{kind}: {count}' for kind, count in sorted(server.counts.items())))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
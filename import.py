@@ -1,76 +1,74 @@
 #!/usr/bin/env python3
-import re
 import sys
 import os
 
 # needed to make fava able to run this file
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-from importers import ing, abn, revolut, amex, ing_from_grabber, revolut_from_grabber, revolut_bv_from_grabber, abn_from_grabber, abn_bv_from_grabber
+from importers.lazy import LazyImporter
 
 from beancount.core import data
-import beangulp
+from ingest import Ingest
+from ingest.autopost import AutoPost
+from ingest.dedup import Deduplicate
+from ingest.predict import Predict
+from ingest.pipeline import Pipeline
 
 
 importers = [
-    ing.Importer("Assets:NL:ING:Checking", "EUR"),
-    ing_from_grabber.Importer("Assets:NL:ING:Checking", "EUR"),
-    abn.Importer("Assets:NL:ABN:Checking", "EUR"),
-    abn_from_grabber.Importer("Assets:NL:ABN:Gezamelijk", "EUR"),
-    abn_bv_from_grabber.Importer("Assets:BV:ABN:Checking", "EUR"),
-    amex.Importer("Liabilities:NL:AMEX", "EUR"),
-    revolut.Importer("Assets:BV:Revolut", "EUR"),
-    revolut_from_grabber.Importer("Assets:NL:Revolut", "EUR"),
-    revolut_bv_from_grabber.Importer("Assets:BV:Revolut", "EUR"),
+    LazyImporter("ing", "Assets:NL:ING:Checking", "EUR"),
+    LazyImporter("ing_from_grabber", "Assets:NL:ING:Checking", "EUR"),
+    LazyImporter("abn", "Assets:NL:ABN:Checking", "EUR"),
+    LazyImporter("abn_from_grabber", "Assets:NL:ABN:Gezamelijk", "EUR"),
+    LazyImporter("abn_bv_from_grabber", "Assets:BV:ABN:Checking", "EUR"),
+    LazyImporter("amex", "Liabilities:NL:AMEX", "EUR"),
+    LazyImporter("revolut", "Assets:BV:Revolut", "EUR"),
+    LazyImporter("revolut_from_grabber", "Assets:NL:Revolut", "EUR"),
+    LazyImporter("revolut_bv_from_grabber", "Assets:BV:Revolut", "EUR"),
+    # Combined csv-grabber exports, the rows carry their own account,
+    # which must be a sub-account of this one. The archive command files
+    # these documents under this account, in Assets/.
+    LazyImporter("grabber", "Assets", "EUR"),
 ]
 
+# Translation table deleting the C0 and C1 control characters.
+NON_PRINTING_CHARS = dict.fromkeys([*range(0x00, 0x20), *range(0x7F, 0xA0)])
+
 def remove_non_printing_chars(s):
-    return re.sub(r'[\x00-\x1F\x7F-\x9F]', '', s)
-
-def clean_up(extracted_entries):
-    """clean up cruft.
-
-    Args:
-      extracted_entries: A list of directives.
-    Returns:
-      A new list of directives with possibly modified payees and narration
-      fields.
-    """
-    clean_entries = []
-    for entry in extracted_entries:
+    return s.translate(NON_PRINTING_CHARS)
+
+def clean_narration(entries):
+    """Remove new lines and other non printing characters from the narration."""
+    for entry in entries:
         if isinstance(entry, data.Transaction):
-            # Remove new lines from narration
-            narration = remove_non_printing_chars(getattr(entry, 'narration', ''))
-            payee = getattr(entry, 'payee', None)
-            if payee:
-                if len(payee.split(' via ')) == 2:
-                    payee = payee.split(' via ')[0]
-
-            entry = entry._replace(narration=narration, payee=payee)
-        clean_entries.append(entry)
-    return clean_entries
-
-
-def process_extracted_entries(extracted_entries_list, ledger_entries):
-    """Process extracted entries to modify payees and clean descriptions.
-
-    Args:
-      extracted_entries_list: A list of (filename, entries) pairs, where
-        'entries' are the directives extract from 'filename'.
-      ledger_entries: If provided, a list of directives from the existing
-        ledger of the user. This is non-None if the user provided their
-        ledger file as an option.
-    Returns:
-      A possibly different version of extracted_entries_list, a list of
-      (filename, entries), to be printed.
-    """
-    return [(filename, clean_up(entries), account, importer)
-            for filename, entries, account, importer in extracted_entries_list]
+            narration = remove_non_printing_chars(entry.narration)
+            if narration != entry.narration:
+                entry = entry._replace(narration=narration)
+        yield entry
+
+def clean_payee(entries):
+    """Strip the "via" part from payees like "Shop via Payment Provider"."""
+    for entry in entries:
+        if isinstance(entry, data.Transaction) and entry.payee:
+            payee, via, rest = entry.payee.partition(' via ')
+            if via and ' via ' not in rest:
+                entry = entry._replace(payee=payee)
+        yield entry
+
+
+# Stages cleaning up cruft in the payees and narrations.
+clean_up = [clean_narration, clean_payee]
+
+# Process extracted entries to modify payees and clean descriptions, then
+# mark the ones already in the ledger as duplicates, add the postings of
+# the auto posting rules of the postprocessor and predict the contra
+# account of the transactions no rule matched.
+process_extracted_entries = Pipeline(*clean_up, Deduplicate(), AutoPost(), Predict())
 
 
 hooks = [process_extracted_entries]
 
 
 if __name__ == '__main__':
-    ingest = beangulp.Ingest(importers, hooks)
+    ingest = Ingest(importers, hooks)
     ingest()
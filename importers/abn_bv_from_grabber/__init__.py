@@ -2,67 +2,61 @@ import csv
 import decimal
 import re
 from os import path
-from beangulp import mimetypes
 from beangulp.importers import csvbase
 from beangulp.testing import main
 
+from importers import base
+from importers import columns
+from importers import sepa
+
 def parseAbnNarration(transactionType, narration):
     narrationSplit = narration.splitlines()
     if narrationSplit[0].startswith('BEA') or transactionType == '247':
-        return re.sub(r' {2,}', ' ',re.sub(r',([^\d ])',', \1',narrationSplit[1])).strip() + ", " + narrationSplit[3]
+        return re.sub(r' {2,}', ' ',re.sub(r',([^\d ])',r', \1',narrationSplit[1])).strip() + ", " + narrationSplit[3], None
 
     if narrationSplit[0] == 'SEPA Overboeking' or transactionType == '944': # ideal
-        match = re.search(r'Omschrijving: ([^:]*)(?:\s*Kenmerk:|$)', narration)
-        if match:
-            # Split the match result into lines
-            lines = match.group(1).splitlines()
-            # Strip each line, filter out empty lines, and join with spaces
-            result = ''.join(line.strip() for line in lines if line.strip())
-            return result
+        fields = sepa.tokenize(narration)
+        if 'REMI' in fields:
+            return fields['REMI'], sepa.metadata(fields)
 
     if transactionType == '526':
-        return re.sub(r' +', ' ', ', '.join(narrationSplit))
+        return re.sub(r' +', ' ', ', '.join(narrationSplit)), None
 
     # apple pay
     if transactionType == '426':
-        return ', '.join(narrationSplit[1:])
+        return ', '.join(narrationSplit[1:]), None
 
     # geldautomaat
     if transactionType == '445':
-        return re.sub(r"GEA, ",'',', '.join(narrationSplit))
+        return re.sub(r"GEA, ",'',', '.join(narrationSplit)), None
 
     # overschrijving
     if transactionType == '658':
-        return 'Overschrijving naar ' + ', '.join(narrationSplit[1:])
+        return 'Overschrijving naar ' + ', '.join(narrationSplit[1:]), None
+
+    raise columns.ParseError('Could not parse description', transactionType, narration)
+
 
-    raise Exception('Could not parse description', transactionType, narration)
+def parseNarration(transactionType, narration):
+    """Return the narration and the metadata of a row."""
+    narration, meta = parseAbnNarration(transactionType, narration)
+    return narration.replace('\n', ' '), meta
 
 
-class AbnNarration(csvbase.Columns):
+class AbnNarration(columns.MultiColumns):
     def parse(self, transactionType, narration):
-        return parseAbnNarration(transactionType, narration).replace('\n', ' ')
+        return parseNarration(transactionType, narration)
 
 
-class Importer(csvbase.Importer):
+class Importer(base.Importer):
     dialect = 'csv-grabber'
 
     date = csvbase.Date('date', '%Y-%m-%d')
     payee = csvbase.Column('payee')
-    narration = AbnNarration('bankTransactionCode','narration')
+    narration, meta = AbnNarration('bankTransactionCode','narration').fields(2)
     amount = csvbase.Amount('amount')
     currency = csvbase.Column('currency')
-
-
-    def identify(self, filepath):
-        filename = path.basename(filepath)
-        mimetype, encoding = mimetypes.guess_type(filepath)
-        if mimetype != 'text/csv':
-            return False
-        if not filename.startswith('Assets.BV.ABN.Checking'):
-            return False
-        if not filename.endswith('.grabber.csv'):
-            return False
-        return True
+    transaction_id = csvbase.Column('id')
 
     def filename(self, filepath):
         return path.basename(filepath)
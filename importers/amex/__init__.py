@@ -2,10 +2,11 @@ import csv
 import decimal
 import re
 from os import path
-from beangulp import mimetypes
 from beangulp.importers import csvbase
 from beangulp.testing import main
 
+from importers import base
+
 csv.register_dialect(
     'amex',
     delimiter=',',
@@ -17,6 +18,9 @@ csv.register_dialect(
 class AmexAmount(csvbase.Column):
     """Specialized Amount class for handling Dutch number formats with comma as decimal separator."""
 
+    # Parsed once per distinct value, see columns.parse().
+    memoize = True
+
     def parse(self, value):
         # Replace comma with dot and remove any whitespace
         normalized_value = value.strip().replace(',', '.')  # Replace comma with dot
@@ -24,22 +28,13 @@ class AmexAmount(csvbase.Column):
 
 
 # Register correct dialect
-class Importer(csvbase.Importer):
+class Importer(base.Importer):
     dialect = 'amex'
 
     date = csvbase.Date('Datum', '%m/%d/%Y')
     amount = AmexAmount('Bedrag')
     narration = csvbase.Column('Omschrijving')
 
-    def identify(self, filepath):
-        mimetype, encoding = mimetypes.guess_type(filepath)
-        if mimetype != 'text/csv':
-            return False
-        with open(filepath, encoding='utf-8-sig') as fd:
-            head = fd.read(1024)
-        return head.startswith("Datum,Omschrijving,Bedrag,Aanvullende informatie,Vermeld op uw rekeningoverzicht als,Adres,Plaats,Postcode,Land,Referentie")
-
-
     def filename(self, filepath):
         return 'amex.' + path.basename(filepath)
 
@@ -0,0 +1,216 @@
+import csv
+import datetime
+from itertools import islice
+
+from beancount.core import data
+from beangulp.importers import csvbase
+
+from importers import columns
+from importers import signatures
+from ingest import metrics
+from ingest import quarantine
+from ingest import watermarks
+
+
+# Dialect of the csv-grabber exports, shared by all grabber importers.
+csv.register_dialect('csv-grabber', delimiter=',', quotechar='"', doublequote=True,
+                     skipinitialspace=True, lineterminator='\n', quoting=csv.QUOTE_MINIMAL)
+
+# Number of rows read and parsed at a time.
+CHUNK_SIZE = 10000
+
+
+class Importer(csvbase.Importer):
+    """Base class for the CSV importers in this package."""
+
+    # Watermarks by account, the rows covered by the watermark of the
+    # account of the document are skipped while reading. Set by the
+    # extract command.
+    watermarks = None
+
+    def identify(self, filepath):
+        return signatures.identify(filepath) == self.name
+
+    def date(self, filepath):
+        # None when the watermarks skip all rows, or there are none.
+        return max((row.date for row in self.read(filepath) if row), default=None)
+
+    def read(self, filepath):
+        """Read the document a column at a time.
+
+        The rows are read CHUNK_SIZE at a time and each column is parsed
+        for all rows of the chunk in turn, the dates and amounts once per
+        distinct value, before the rows are yielded with their parsed
+        values set as attributes. The date, transaction id and account
+        columns are parsed first, to skip the rows covered by the
+        watermark of the account of the document, or of the row. Empty and skipped rows are yielded as
+        empty rows, which extract() ignores, to keep the line numbers of
+        the other rows right.
+
+        While the quarantine is enabled, the rows with a value that does
+        not parse are quarantined and skipped, instead of failing the
+        whole document.
+        """
+        marks = self.watermarks or {}
+        # The rows of the documents with an account column are checked
+        # against the watermark of their own account.
+        by_row = 'account' in self.columns
+        watermark = None if by_row else marks.get(self.account(filepath))
+        first = [key for key in ('date', 'transaction_id', 'account') if key in self.columns]
+        others = [key for key in self.columns if key not in first]
+        tolerant = quarantine.current is not None
+        offset = int(self.skiplines) + bool(self.names) + 1
+        rows = skipped = quarantined = 0
+        with open(filepath, encoding=self.encoding) as fd:
+            lines = islice(fd, self.skiplines, None)
+            if self.comments:
+                lines = (line for line in lines if not line.startswith(self.comments))
+            reader = csv.reader(lines, dialect=self.dialect)
+            names = headers = None
+            if self.names:
+                headers = next(reader, None)
+                if headers is None:
+                    raise IndexError('The input file does not contain an header line')
+                names = {name.strip(): index for index, name in enumerate(headers)}
+            # The parsed values are set in the instance dictionary, where
+            # the attribute lookups of extract() find them.
+            row = type('Row', (tuple, ), {})
+            while chunk := [row(x) for x in islice(reader, CHUNK_SIZE)]:
+                # The failed rows by id(), collected in tolerant mode only.
+                errors = {}
+                collected = errors if tolerant else None
+                self._parse(names, [x for x in chunk if x], first, collected)
+                if watermark is not None or by_row and marks:
+                    for index, x in enumerate(chunk):
+                        if not x or id(x) in errors:
+                            continue
+                        mark = marks.get(x.account) if by_row else watermark
+                        if mark is not None and mark.covers(
+                                x.date, watermarks.rowid(x, getattr(x, 'transaction_id', None))):
+                            chunk[index] = row()
+                            skipped += 1
+                self._parse(names, [x for x in chunk if x and id(x) not in errors], others,
+                            collected)
+                if errors:
+                    for index, x in enumerate(chunk):
+                        error = errors.get(id(x)) if x else None
+                        if error is not None:
+                            quarantine.add(self.name, filepath, offset + rows + index, headers,
+                                           list(x), error)
+                            chunk[index] = row()
+                            quarantined += 1
+                rows += len(chunk)
+                yield from chunk
+        metrics.count(f'{self.name}.rows', rows)
+        metrics.count(f'{self.name}.skipped', skipped)
+        metrics.count(f'{self.name}.quarantined', quarantined)
+
+    def _parse(self, names, rows, keys, errors=None):
+        for key in keys:
+            with metrics.timed('columns', f'{self.name}.{key}', values=len(rows)):
+                values = columns.parse(self.columns[key], names, rows, errors)
+            for x, value in zip(rows, values):
+                x.__dict__[key] = value
+            if errors:
+                # The other columns of the failed rows need no parsing.
+                rows = [x for x in rows if id(x) not in errors]
+
+    def _entries(self, filepath):
+        """Yield a (transaction, balance) pair for each row, in file order.
+
+        The transactions are built like csvbase does, balance is the
+        balance assertion of the row, or None.
+        """
+        default_account = self.account(filepath)
+        offset = int(self.skiplines) + bool(self.names) + 1
+        for lineno, row in enumerate(self.read(filepath), offset):
+            if not row:
+                continue
+            tag = getattr(row, 'tag', None)
+            link = getattr(row, 'link', None)
+            account = getattr(row, 'account', default_account)
+            currency = getattr(row, 'currency', self.currency)
+            txn = data.Transaction(self.metadata(filepath, lineno, row),
+                                   row.date, getattr(row, 'flag', self.flag),
+                                   getattr(row, 'payee', None), row.narration,
+                                   {tag} if tag else csvbase.EMPTY, {link} if link else csvbase.EMPTY, [
+                                       data.Posting(account, data.Amount(row.amount, currency),
+                                                    None, None, None, None),
+                                   ])
+            txn = self.finalize(txn, row)
+            if txn is None:
+                continue
+            balance = getattr(row, 'balance', None)
+            if balance is not None:
+                balance = data.Balance(data.new_metadata(filepath, lineno),
+                                       row.date + datetime.timedelta(days=1), account,
+                                       data.Amount(balance, currency), None, None)
+            yield txn, balance
+
+    def _order(self, first, last):
+        if self.order is not None:
+            return self.order
+        return csvbase.Order.ASCENDING if first <= last else csvbase.Order.DESCENDING
+
+    def extract(self, filepath, existing):
+        entries = []
+        balances = {}
+        for txn, balance in self._entries(filepath):
+            entries.append(txn)
+            if balance is not None:
+                balances.setdefault(balance.amount.currency, []).append(balance)
+        if not entries:
+            return []
+        order = self._order(entries[0].date, entries[-1].date)
+        if order is csvbase.Order.DESCENDING:
+            entries.reverse()
+        for currency, found in balances.items():
+            entries.append(found[-1 if order is csvbase.Order.ASCENDING else 0])
+        return entries
+
+    def stream(self, filepath, existing):
+        """Extract the entries of a document lazily.
+
+        Like extract(), but the transactions are yielded in the order of
+        the rows of the document as they are read, and the balance
+        assertions after them, so the document is never held in memory.
+
+        Args:
+          filepath: Filesystem path to the document.
+          existing: Existing entries.
+        Yields:
+          The extracted directives.
+        """
+        # The first and the last balance of each currency, the one kept
+        # depends on the order of the document, known at the end.
+        first, last = {}, {}
+        first_date = last_date = None
+        for txn, balance in self._entries(filepath):
+            if first_date is None:
+                first_date = txn.date
+            last_date = txn.date
+            yield txn
+            if balance is not None:
+                first.setdefault(balance.amount.currency, balance)
+                last[balance.amount.currency] = balance
+        if first_date is not None:
+            order = self._order(first_date, last_date)
+            yield from (last if order is csvbase.Order.ASCENDING else first).values()
+
+    def metadata(self, filepath, lineno, row):
+        meta = super().metadata(filepath, lineno, row)
+        # The id the bank assigned to the transaction, from the grabber exports.
+        transaction_id = getattr(row, 'transaction_id', None)
+        if transaction_id:
+            meta['transaction_id'] = transaction_id
+        meta[watermarks.ROWID] = watermarks.rowid(row, transaction_id)
+        # Further fields of the description, from importers with a meta column.
+        extra = getattr(row, 'meta', None)
+        if extra:
+            meta.update(extra)
+        return meta
+
+    def deduplicate(self, entries, existing):
+        # Duplicates are found by the ingest.dedup.Deduplicate import hook
+        # stage, with an index of the existing entries.
+        pass
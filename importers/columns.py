@@ -0,0 +1,104 @@
+import operator
+
+from beangulp.importers import csvbase
+
+
+class ParseError(ValueError):
+    """A value the parser of a column does not recognize."""
+
+
+# Marker of the values not parsed yet. The parsers run outside of the
+# lookups, so their exceptions are not chained to a KeyError.
+_MISSING = object()
+
+
+class MultiColumns(csvbase.Columns):
+    """A column whose parser fills several fields at once.
+
+    parse() returns a tuple with one value per field. The fields are
+    declared with fields(), which returns one column per tuple element
+    to be assigned to the importer attributes:
+
+        payee, narration = PayeeNarration('Description', 'Reference').fields(2)
+
+    The parser runs once per row, however many of the fields are read.
+    """
+
+    def fields(self, count):
+        return tuple(_Field(self, index) for index in range(count))
+
+
+class _Field(csvbase.Column):
+    """One element of the value of a MultiColumns column."""
+
+    def __init__(self, column, index):
+        super().__init__(*column.names)
+        self.column = column
+        self.index = index
+
+    def getter(self, names):
+        parse = self.column.getter(names)
+        column = self.column
+        index = self.index
+        def func(obj):
+            # The csvbase rows are tuple subclasses with an instance
+            # dictionary, where the parsed tuple is kept for the other
+            # fields of the same column.
+            cache = obj.__dict__
+            values = cache.get(column, _MISSING)
+            if values is _MISSING:
+                values = cache[column] = parse(obj)
+            return values[index]
+        return func
+
+
+def memoized(column):
+    """Tell whether a column is parsed once per distinct raw value.
+
+    Dates and amounts repeat a lot across the rows of an export and
+    their parsers only depend on the raw values, so they are memoized by
+    default. Other columns opt in with a true memoize attribute.
+    """
+    return getattr(column, 'memoize', isinstance(column, (csvbase.Date, csvbase.Amount)))
+
+
+def _tolerant(getter, errors):
+    def func(row):
+        try:
+            return getter(row)
+        except (ValueError, ArithmeticError, IndexError) as error:
+            errors[id(row)] = error
+            return None
+    return func
+
+
+def parse(column, names, rows, errors=None):
+    """Parse the values of a column for all rows of a document.
+
+    Args:
+      column: A csvbase column.
+      names: A dict mapping column names to column indices.
+      rows: The non empty rows, as csvbase rows.
+      errors: A dict, or None. If given, the value of the rows that fail
+        to parse is None and the exception is stored in errors by the
+        id() of the row, instead of being raised.
+    Returns:
+      A list with the value of the column for each row.
+    """
+    getter = column.getter(names)
+    if errors is not None:
+        getter = _tolerant(getter, errors)
+    if not column.names or not memoized(column):
+        return [getter(row) for row in rows]
+    key = operator.itemgetter(*(csvbase._resolve(name, names) for name in column.names))
+    memo = {}
+    values = []
+    for row in rows:
+        raw = key(row)
+        value = memo.get(raw, _MISSING)
+        if value is _MISSING:
+            value = getter(row)
+            if errors is None or id(row) not in errors:
+                memo[raw] = value
+        values.append(value)
+    return values
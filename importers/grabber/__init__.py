@@ -0,0 +1,71 @@
+"""Importer of the combined exports of the csv-grabber.
+
+The csv-grabber can write the transactions of all accounts to a single
+file, with the account of each row in an account column, instead of a
+file per account. The rows of all accounts are read in one pass and
+the narration of each row is parsed by the parser of its account in
+the PARSERS table, so adding an account of a supported bank is adding
+its entry. Rows of accounts without an entry do not parse.
+
+The accounts of the rows are sub-accounts of the account the importer
+is configured with, which the extract cache relies on to invalidate the
+entries of a document when the watermark of any of them moves.
+"""
+from os import path
+from beangulp.importers import csvbase
+
+from importers import abn_bv_from_grabber
+from importers import abn_from_grabber
+from importers import base
+from importers import columns
+from importers import ing_from_grabber
+from importers import revolut_bv_from_grabber
+from importers import revolut_from_grabber
+
+
+# Narration parsers by account. A parser takes the bank transaction code
+# and the narration of a row and returns the narration and the metadata
+# of its transaction.
+PARSERS = {
+    'Assets:NL:ING:Checking': ing_from_grabber.parseNarration,
+    'Assets:NL:ABN:Gezamelijk': abn_from_grabber.parseNarration,
+    'Assets:BV:ABN:Checking': abn_bv_from_grabber.parseNarration,
+    'Assets:NL:Revolut': revolut_from_grabber.parseNarration,
+    'Assets:BV:Revolut': revolut_bv_from_grabber.parseNarration,
+}
+
+
+def _account(value):
+    # The csv-grabber writes the accounts like its file names.
+    account = value.strip().replace('.', ':')
+    if account not in PARSERS:
+        raise columns.ParseError('No narration parser for account', value)
+    return account
+
+
+class GrabberAccount(csvbase.Column):
+    # Parsed once per distinct value, see columns.parse().
+    memoize = True
+
+    def parse(self, value):
+        return _account(value)
+
+
+class GrabberNarration(columns.MultiColumns):
+    def parse(self, account, transactionType, narration):
+        return PARSERS[_account(account)](transactionType, narration)
+
+
+class Importer(base.Importer):
+    dialect = 'csv-grabber'
+
+    date = csvbase.Date('date', '%Y-%m-%d')
+    account = GrabberAccount('account')
+    payee = csvbase.Column('payee')
+    narration, meta = GrabberNarration('account', 'bankTransactionCode', 'narration').fields(2)
+    amount = csvbase.Amount('amount')
+    currency = csvbase.Column('currency')
+    transaction_id = csvbase.Column('id')
+
+    def filename(self, filepath):
+        return path.basename(filepath)
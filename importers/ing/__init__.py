@@ -1,11 +1,15 @@
 import csv
 import decimal
+import functools
 import re
 from os import path
-from beangulp import mimetypes
 from beangulp.importers import csvbase
 from beangulp.testing import main
 
+from importers import base
+from importers import columns
+from ingest import metrics
+
 class StaticColumn(csvbase.Column):
     """A column that returns a static value."""
     def __init__(self, value):
@@ -21,65 +25,83 @@ csv.register_dialect('ing', delimiter=';', quoting=csv.QUOTE_MINIMAL)
 class IngAmount(csvbase.Columns):
     """Specialized Amount class for handling Dutch number formats with comma as decimal separator."""
 
+    # Parsed once per distinct value, see columns.parse().
+    memoize = True
+
     def parse(self, value, debitOrCredit):
         # Replace comma with dot and remove any whitespace
         normalized_value = value.strip().replace(',', '.')  # Replace comma with dot
         value = decimal.Decimal(normalized_value)
         return value if debitOrCredit == 'Credit' else -value
 
-def parseIngNarration(transactionType, name, notifications):
-        if transactionType in ['iDEAL', 'SEPA direct debit', 'Batch payment', 'Transfer', 'Online Banking']:
-            match = re.search(r"^Name: (.*)Description: (.*) IBAN: ", notifications)
-            if match:
-                payee = match.group(1).strip()
-                narration = match.group(2).strip()
-
-                if narration.startswith(payee):
-                    narration = narration[len(payee):].strip()
-                return payee, narration
-        if transactionType == 'Online Banking':
-            match = re.search(r'^(?:From|To) (.*) (Value .*)', notifications)
-            if match:
-                payee = match.group(1).strip()
-                narration = match.group(2).strip()
-                return payee, narration
-
-        if transactionType == 'Various':
-            return None, name
+def _matchNameDescription(name, notifications):
+    # Same result as re.match(r"Name: (.*)Description: (.*) IBAN: ", notifications)
+    # but found with two rfind() calls, as the greedy groups backtrack
+    # quadratically on long notifications that do not match.
+    line = notifications.partition('\n')[0]
+    if not line.startswith('Name: '):
+        return None
+    iban = line.rfind(' IBAN: ')
+    description = line.rfind('Description: ', 6, iban) if iban != -1 else -1
+    if description == -1:
+        return None
+
+    payee = line[6:description].strip()
+    narration = line[description + 13:iban].strip()
+
+    if narration.startswith(payee):
+        narration = narration[len(payee):].strip()
+    return payee, narration
+
+_fromTo = re.compile(r'(?:From|To) (.*) (Value .*)')
+
+def _matchFromTo(name, notifications):
+    match = _fromTo.match(notifications)
+    if match:
+        return match.group(1).strip(), match.group(2).strip()
+    return None
+
+# Parsers to try, in order, for each transaction type.
+_parsers = {
+    'iDEAL': [_matchNameDescription],
+    'SEPA direct debit': [_matchNameDescription],
+    'Batch payment': [_matchNameDescription],
+    'Transfer': [_matchNameDescription],
+    'Online Banking': [_matchNameDescription, _matchFromTo],
+    'Various': [lambda name, notifications: (None, name)],
+    'Payment terminal': [lambda name, notifications: (name, notifications)],
+}
+
+@functools.lru_cache(maxsize=4096)
+def _parseIngNarration(transactionType, name, notifications):
+    # Also returns whether a fallback parser matched.
+    for index, parser in enumerate(_parsers.get(transactionType, ())):
+        result = parser(name, notifications)
+        if result is not None:
+            return result, index > 0
+
+    raise columns.ParseError('Could not parse description', transactionType, name, notifications)
 
-        if transactionType == 'Payment terminal':
-            return name, notifications
-
-        raise Exception('Could not parse description', transactionType, name, notifications)
-
-class IngNarrationOrPayee(csvbase.Columns):
-    def __init__(self, ca,cb,cc, returnNarration=True):
-        super().__init__(ca,cb,cc)
-        self.returnNarration = returnNarration
+def parseIngNarration(transactionType, name, notifications):
+    # The fallbacks are counted per row, not per call of the cached parser.
+    result, fallback = _parseIngNarration(transactionType, name, notifications)
+    if fallback:
+        metrics.count('importers.ing.fallbacks')
+    return result
 
-    def parse(self, transactionType,name, notifications):
-        payee, narration = parseIngNarration(transactionType, name, notifications)
-        return narration if self.returnNarration else payee
+class IngPayeeNarration(columns.MultiColumns):
+    def parse(self, transactionType, name, notifications):
+        return parseIngNarration(transactionType, name, notifications)
 
 
-class Importer(csvbase.Importer):
+class Importer(base.Importer):
     dialect = 'ing'
 
     date = csvbase.Date('Date', '%Y%m%d')
-    payee = IngNarrationOrPayee('Transaction type','Name / Description','Notifications', returnNarration=False)
-    narration = IngNarrationOrPayee('Transaction type','Name / Description','Notifications', returnNarration=True)
+    payee, narration = IngPayeeNarration('Transaction type','Name / Description','Notifications').fields(2)
 
     amount = IngAmount('Amount (EUR)', 'Debit/credit')
 
-
-    def identify(self, filepath):
-        mimetype, encoding = mimetypes.guess_type(filepath)
-        if mimetype != 'text/csv':
-            return False
-        with open(filepath) as fd:
-            head = fd.read(1024)
-        return head.startswith('"Date";"Name / Description";"Account";"Counterparty";"Code";"Debit/credit";"Amount (EUR)";"Transaction type";"Notifications";"Resulting balance";"Tag"')
-
     def filename(self, filepath):
         return 'ing.' + path.basename(filepath)
 
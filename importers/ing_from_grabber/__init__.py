@@ -1,11 +1,13 @@
-import csv
 import decimal
-import re
+import functools
 from os import path
-from beangulp import mimetypes
 from beangulp.importers import csvbase
 from beangulp.testing import main
 
+from importers import base
+from importers import columns
+from ingest import metrics
+
 class StaticColumn(csvbase.Column):
     """A column that returns a static value."""
     def __init__(self, value):
@@ -15,48 +17,86 @@ class StaticColumn(csvbase.Column):
     def parse(self):
         return self.value
 
-# Register correct dialect
-csv.register_dialect('csv-grabber', delimiter=',', quotechar='"', doublequote=True,
-                     skipinitialspace=True, lineterminator='\n', quoting=csv.QUOTE_MINIMAL)
-
-
-def parseIngNarration(transactionType, narration):
-    if transactionType in ['iDEAL','Verzamelbetaling', 'Incasso', 'Overschrijving', 'Online bankieren']:
-        match = re.search(r"^Naam: (.*)<br>Omschrijving:(.*)<br>IBAN: (.*?)<br>", narration)
-        if match:
-            payee = match.group(1).strip()
-            narration = match.group(2).strip()
-
-            if narration.startswith(payee):
-                narration = narration[len(payee):].strip()
-
-            if transactionType == 'Online bankieren':
-                narration = match.group(3) + " - " + match.group(2)
-
-            return narration
-    if transactionType == 'Betaalautomaat':
+def _matchNaam(transactionType, narration):
+    # Same result as
+    # re.match(r"Naam: (.*)<br>Omschrijving:(.*)<br>IBAN: (.*?)<br>", narration)
+    # but found with find() calls, as the greedy groups backtrack badly
+    # on long narrations that do not match.
+    line = narration.partition('\n')[0]
+    if not line.startswith('Naam: '):
+        return None
+    end = line.rfind('<br>')
+    iban = line.rfind('<br>IBAN: ', 0, end) if end != -1 else -1
+    omschrijving = line.rfind('<br>Omschrijving:', 6, iban) if iban != -1 else -1
+    if omschrijving == -1:
+        return None
+
+    payee = line[6:omschrijving].strip()
+    description = line[omschrijving + 17:iban]
+    narration = description.strip()
+
+    if narration.startswith(payee):
+        narration = narration[len(payee):].strip()
+
+    if transactionType == 'Online bankieren':
+        narration = line[iban + 10:line.find('<br>', iban + 10)] + " - " + description
+
+    return narration
+
+def _matchValutadatum(transactionType, narration):
+    if narration.startswith('Van') or narration.startswith('Naar'):
         return ''
 
-    if transactionType in ['Diversen','Online bankieren','Overschrijving', 'Geldautomaat']:
-        if narration.startswith('Van') or narration.startswith('Naar'):
-            return ''
-
-        match = re.search(r"(.*?)(?:<br>Datum\/Tijd:.*)?<br>Valutadatum:.*", narration)
-        if match:
-            narration= match.group(1).strip()
-            return narration
+    # Same result as
+    # re.search(r"(.*?)(?:<br>Datum\/Tijd:.*)?<br>Valutadatum:.*", narration)
+    # without retrying the lazy group from every position of the input.
+    for line in narration.split('\n'):
+        valutadatum = line.find('<br>Valutadatum:')
+        if valutadatum != -1:
+            datumTijd = line.find('<br>Datum/Tijd:', 0, valutadatum)
+            return line[:valutadatum if datumTijd == -1 else datumTijd].strip()
+    return None
+
+# Parsers to try, in order, for each transaction type.
+_parsers = {
+    'iDEAL': [_matchNaam],
+    'Verzamelbetaling': [_matchNaam],
+    'Incasso': [_matchNaam],
+    'Overschrijving': [_matchNaam, _matchValutadatum],
+    'Online bankieren': [_matchNaam, _matchValutadatum],
+    'Betaalautomaat': [lambda transactionType, narration: ''],
+    'Diversen': [_matchValutadatum],
+    'Geldautomaat': [_matchValutadatum],
+    'Payment terminal': [lambda transactionType, narration: narration],
+}
+
+@functools.lru_cache(maxsize=4096)
+def _parseIngNarration(transactionType, narration):
+    # Also returns whether a fallback parser matched.
+    for index, parser in enumerate(_parsers.get(transactionType, ())):
+        result = parser(transactionType, narration)
+        if result is not None:
+            return result, index > 0
+
+    raise columns.ParseError('Could not parse description', transactionType, narration)
 
-    if transactionType == 'Payment terminal':
-        return narration
+def parseIngNarration(transactionType, narration):
+    # The fallbacks are counted per row, not per call of the cached parser.
+    result, fallback = _parseIngNarration(transactionType, narration)
+    if fallback:
+        metrics.count('importers.ing_from_grabber.fallbacks')
+    return result
 
-    raise Exception('Could not parse description', transactionType, narration)
+def parseNarration(transactionType, narration):
+    """Return the narration and the metadata of a row."""
+    return parseIngNarration(transactionType, narration).replace("<br>", " ").strip(), None
 
 class IngNarration(csvbase.Columns):
     def parse(self, transactionType, narration):
-        return parseIngNarration(transactionType, narration).replace("<br>", " ").strip()
+        return parseNarration(transactionType, narration)[0]
 
 
-class Importer(csvbase.Importer):
+class Importer(base.Importer):
     dialect = 'csv-grabber'
 
     date = csvbase.Date('date', '%Y-%m-%d')
@@ -64,18 +104,7 @@ class Importer(csvbase.Importer):
     narration = IngNarration('bankTransactionCode','narration')
     amount = csvbase.Amount('amount')
     currency = csvbase.Column('currency')
-
-
-    def identify(self, filepath):
-        filename = path.basename(filepath)
-        mimetype, encoding = mimetypes.guess_type(filepath)
-        if mimetype != 'text/csv':
-            return False
-        if not filename.startswith('Assets.NL.ING.Checking'):
-            return False
-        if not filename.endswith('.grabber.csv'):
-            return False
-        return True
+    transaction_id = csvbase.Column('id')
 
     def filename(self, filepath):
         return path.basename(filepath)
@@ -0,0 +1,85 @@
+"""Importers whose module is imported on first use.
+
+A LazyImporter knows the account, currency and flag of the importer it
+stands for and identifies documents with the signatures table, so
+listing the importers and identifying documents, as Fava and the
+identify command do, does not import any importer module. The module
+is imported, and the importer instantiated, the first time a document
+identified by it needs to be processed.
+"""
+import importlib
+
+import beangulp
+
+from importers import signatures
+
+
+class LazyImporter(beangulp.Importer):
+    """Stand-in for an importer of this package.
+
+    Args:
+      module: Name of the importer module in this package, like 'ing'.
+      account: Importer default account.
+      currency: Importer default currency.
+      flag: Importer default flag for new transactions.
+    """
+
+    def __init__(self, module, account, currency, flag='*'):
+        self.module = f'{__package__}.{module}'
+        self.importer_account = account
+        self.currency = currency
+        self.flag = flag
+        self._watermarks = None
+        self._importer = None
+
+    @property
+    def name(self):
+        return f'{self.module}.Importer'
+
+    @property
+    def importer(self):
+        """The importer instance, imported on first access."""
+        if self._importer is None:
+            module = importlib.import_module(self.module)
+            importer = module.Importer(self.importer_account, self.currency, self.flag)
+            importer.watermarks = self._watermarks
+            self._importer = importer
+        return self._importer
+
+    @property
+    def watermarks(self):
+        return self._watermarks
+
+    @watermarks.setter
+    def watermarks(self, watermarks):
+        self._watermarks = watermarks
+        if self._importer is not None:
+            self._importer.watermarks = watermarks
+
+    def __getstate__(self):
+        # Worker processes import the module themselves when needed.
+        return {**self.__dict__, '_importer': None}
+
+    def identify(self, filepath):
+        return signatures.identify(filepath) == self.name
+
+    def account(self, filepath):
+        return self.importer_account
+
+    def date(self, filepath):
+        return self.importer.date(filepath)
+
+    def filename(self, filepath):
+        return self.importer.filename(filepath)
+
+    def extract(self, filepath, existing):
+        return self.importer.extract(filepath, existing)
+
+    def stream(self, filepath, existing):
+        return self.importer.stream(filepath, existing)
+
+    def deduplicate(self, entries, existing):
+        return self.importer.deduplicate(entries, existing)
+
+    def sort(self, entries, reverse=False):
+        return self.importer.sort(entries, reverse)
@@ -2,10 +2,12 @@ import csv
 import decimal
 import re
 from os import path
-from beangulp import mimetypes
 from beangulp.importers import csvbase
 from beangulp.testing import main
 
+from importers import base
+from importers import columns
+
 csv.register_dialect(
     'revolut',
     delimiter=',',
@@ -14,13 +16,9 @@ csv.register_dialect(
     lineterminator='\r\n'
 )
 
-class RevolutNarrationPayee(csvbase.Columns):
+class RevolutPayeeNarration(columns.MultiColumns):
     """Class for handling narration and payee details from Revolut CSV export."""
 
-    def __init__(self, name1, name2, flag='narration'):
-        super().__init__(name1, name2)
-        self.flag = flag  # Flag to determine whether to return payee or narration
-
     def split_description(self, description, reference):
         if reference is None:
             return description, None
@@ -30,28 +28,15 @@ class RevolutNarrationPayee(csvbase.Columns):
 
     def parse(self, description, reference):
         description, payee = self.split_description(description, reference)
-        if self.flag == 'payee':
-            return payee
-        else:  # default to narration
-            return description
+        return payee, description
 
 # Register correct dialect
-class Importer(csvbase.Importer):
+class Importer(base.Importer):
     dialect = 'revolut'
 
     date = csvbase.Date('Date completed (UTC)', '%Y-%m-%d')
     amount = csvbase.Amount('Amount')
-    narration = RevolutNarrationPayee('Description','Reference', flag='narration')
-    payee = RevolutNarrationPayee('Description','Reference', flag='payee')
-
-    def identify(self, filepath):
-        mimetype, encoding = mimetypes.guess_type(filepath)
-        if mimetype != 'text/csv':
-            return False
-        with open(filepath, encoding='utf-8-sig') as fd:
-            head = fd.read(1024)
-        return head.startswith("Date started (UTC),Date completed (UTC),ID,Type,Description,Reference,Payer,Card number,Orig currency,Orig amount,Payment currency,Amount,Fee,Balance,Account,Beneficiary account number,Beneficiary sort code or routing number,Beneficiary IBAN,Beneficiary BIC")
-
+    payee, narration = RevolutPayeeNarration('Description','Reference').fields(2)
 
     def filename(self, filepath):
         return 'revolut.' + path.basename(filepath)
@@ -2,21 +2,27 @@ import csv
 import decimal
 import re
 from os import path
-from beangulp import mimetypes
 from beangulp.importers import csvbase
 from beangulp.testing import main
 
+from importers import base
+
 def parseRevolutNarration(transactionType, narration):
     if transactionType == 'TOPUP':
         return ' '.join(narration.split('\n')[1:])
     return narration
 
+def parseNarration(transactionType, narration):
+    """Return the narration and the metadata of a row."""
+    return parseRevolutNarration(transactionType, narration).replace('\n', ' '), None
+
+
 class RevolutNarration(csvbase.Columns):
     def parse(self, transactionType, narration):
-        return parseRevolutNarration(transactionType, narration).replace('\n', ' ')
+        return parseNarration(transactionType, narration)[0]
 
 
-class Importer(csvbase.Importer):
+class Importer(base.Importer):
     dialect = 'csv-grabber'
 
     date = csvbase.Date('date', '%Y-%m-%d')
@@ -24,18 +30,7 @@ class Importer(csvbase.Importer):
     narration = RevolutNarration('bankTransactionCode','narration')
     amount = csvbase.Amount('amount')
     currency = csvbase.Column('currency')
-
-
-    def identify(self, filepath):
-        filename = path.basename(filepath)
-        mimetype, encoding = mimetypes.guess_type(filepath)
-        if mimetype != 'text/csv':
-            return False
-        if not filename.startswith('Assets.BV.Revolut'):
-            return False
-        if not filename.endswith('.grabber.csv'):
-            return False
-        return True
+    transaction_id = csvbase.Column('id')
 
     def filename(self, filepath):
         return path.basename(filepath)
@@ -0,0 +1,121 @@
+"""Tokenizer of the descriptions of the SEPA transactions of ABN AMRO.
+
+The descriptions come in two layouts, a /TAG/value/ one:
+
+    /TRTP/SEPA OVERBOEKING/IBAN/NL12ABNA0123456789/BIC/ABNANL2A/NAME/J DOE/REMI/Huur/EREF/E1
+
+and a Key: value one, with the fields padded with spaces in the CSV
+exports and on lines of their own in the grabber exports:
+
+    SEPA Overboeking  IBAN: NL12ABNA0123456789  BIC: ABNANL2A  Naam: J DOE  Omschrijving: Huur
+
+tokenize() reads either layout in a single scan into a dict of the
+fields by their SEPA tag, the Dutch keys translated, so the importers
+build the narration from the fields they need and add the others to
+the metadata of the transactions.
+"""
+import re
+
+
+# Tags of the /TAG/value/ layout. A value containing a slash runs up
+# to the next known tag.
+TAGS = frozenset(('TRTP', 'CSID', 'NAME', 'MARF', 'REMI', 'IBAN', 'BIC', 'EREF', 'ORDP',
+                  'BENM', 'ID', 'ADDR', 'USTD', 'STRD', 'CDTRREF', 'CDTRREFTP', 'ISSR'))
+
+# Tags of the keys of the Key: value layout. The text before the first
+# key is the transaction type. Other keys starting a line, like the
+# Betalingskenm.: of the grabber exports, end the value before them and
+# are left out.
+KEYS = {
+    'IBAN': 'IBAN',
+    'BIC': 'BIC',
+    'Naam': 'NAME',
+    'Omschrijving': 'REMI',
+    'Kenmerk': 'EREF',
+    'Machtiging': 'MARF',
+    'Incassant': 'CSID',
+}
+
+# Fields added to the metadata of the transactions, by their key.
+METADATA = {
+    'IBAN': 'iban',
+    'BIC': 'bic',
+    'EREF': 'reference',
+    'CSID': 'creditor_id',
+    'MARF': 'mandate',
+}
+
+# Value of the fields left empty.
+NOTPROVIDED = 'NOTPROVIDED'
+
+# Either layout is split by a single regular expression. The keys are
+# checked to start a word in Python: a look-behind would keep the
+# regular expression engine from skipping to their first letters.
+_tag = re.compile('/(' + '|'.join(sorted(TAGS)) + ')/')
+_key = re.compile('(' + '|'.join(KEYS) + r'|\n[A-Z][\w.]*):')
+
+# The metadata keys by tag, as a sequence.
+_metadata = tuple(METADATA.items())
+
+
+def _unwrap(value):
+    # The values of the grabber exports wrap over lines at a fixed
+    # width, sometimes in the middle of a word.
+    if '\n' not in value:
+        return value.strip()
+    return ''.join(line.strip() for line in value.splitlines())
+
+
+def _tags(text, clean):
+    parts = _tag.split(text)
+    if parts[-1].endswith('/'):
+        parts[-1] = parts[-1][:-1]
+    return {parts[index]: clean(parts[index + 1]) for index in range(1, len(parts), 2)}
+
+
+def _keys(text, clean):
+    parts = _key.split(text)
+    fields = {}
+    tag, value = 'TRTP', parts[0]
+    for index in range(1, len(parts), 2):
+        key, rest = parts[index], parts[index + 1]
+        if key[0] == '\n':
+            # A key starting a line, known or not.
+            key = key[1:]
+        elif value and not value[-1].isspace():
+            # The end of a word of the value, not a key.
+            value += key + ':' + rest
+            continue
+        if tag is not None:
+            fields[tag] = clean(value)
+        tag, value = KEYS.get(key), rest
+    if tag is not None:
+        fields[tag] = clean(value)
+    fields['TRTP'] = ' '.join(fields['TRTP'].split())
+    return fields
+
+
+def tokenize(text):
+    """Split the description of a SEPA transaction into its fields.
+
+    Args:
+      text: The description, in either layout.
+    Returns:
+      A dict mapping the SEPA tags, like 'TRTP', 'NAME' or 'REMI', to
+      the values of the fields, stripped and unwrapped.
+    """
+    text = text.strip()
+    clean = _unwrap if '\n' in text else str.strip
+    if text.startswith('/'):
+        return _tags(text, clean)
+    return _keys(text, clean)
+
+
+def metadata(fields):
+    """The metadata of a transaction from the fields of its description."""
+    meta = {}
+    for tag, key in _metadata:
+        value = fields.get(tag)
+        if value and value != NOTPROVIDED:
+            meta[key] = value
+    return meta
@@ -0,0 +1,94 @@
+"""Header and filename signatures of the documents we can import.
+
+Instead of every importer opening a document to test its own header,
+the head of the document is read once and matched against the
+signatures of all importers in a single lookup. The result is cached
+on (path, size, mtime), so re-identifying an unchanged downloads
+directory, as Fava does on every refresh of its import page, only
+costs a stat() per document.
+"""
+import functools
+import os
+import re
+from os import path
+
+from beangulp import mimetypes
+
+
+# Header line of the bank exports, mapped to the name of the importer
+# handling them.
+HEADERS = {
+    '"Date";"Name / Description";"Account";"Counterparty";"Code";"Debit/credit";"Amount (EUR)";"Transaction type";"Notifications";"Resulting balance";"Tag"':
+        'importers.ing.Importer',
+    'Rekeningnummer;Muntsoort;Transactiedatum;Rentedatum;Beginsaldo;Eindsaldo;Transactiebedrag;Omschrijving':
+        'importers.abn.Importer',
+    'Datum,Omschrijving,Bedrag,Aanvullende informatie,Vermeld op uw rekeningoverzicht als,Adres,Plaats,Postcode,Land,Referentie':
+        'importers.amex.Importer',
+    'id,date,amount,currency,payee,narration,bankTransactionCode,account':
+        'importers.grabber.Importer',
+    'Date started (UTC),Date completed (UTC),ID,Type,Description,Reference,Payer,Card number,Orig currency,Orig amount,Payment currency,Amount,Fee,Balance,Account,Beneficiary account number,Beneficiary sort code or routing number,Beneficiary IBAN,Beneficiary BIC':
+        'importers.revolut.Importer',
+}
+
+# The csv-grabber names its output after the account it belongs to. Its
+# combined output, with an account column, is identified by its header.
+GRABBER_SUFFIX = '.grabber.csv'
+PREFIXES = {
+    'Assets.NL.ING.Checking': 'importers.ing_from_grabber.Importer',
+    'Assets.NL.ABN.Gezamelijk': 'importers.abn_from_grabber.Importer',
+    'Assets.BV.ABN.Checking': 'importers.abn_bv_from_grabber.Importer',
+    'Assets.NL.Revolut': 'importers.revolut_from_grabber.Importer',
+    'Assets.BV.Revolut': 'importers.revolut_bv_from_grabber.Importer',
+}
+
+# Number of bytes read from the head of a document.
+HEAD_BYTES = 1024
+
+
+class _Table:
+    """Prefix lookup table compiled into a single regular expression."""
+
+    def __init__(self, signatures):
+        # Longest first so the most specific signature wins.
+        items = sorted(signatures.items(), key=lambda item: len(item[0]), reverse=True)
+        self.names = [name for signature, name in items]
+        self.regexp = re.compile('|'.join(
+            f'(?P<_{i}>{re.escape(signature)})' for i, (signature, name) in enumerate(items)))
+
+    def match(self, string):
+        match = self.regexp.match(string)
+        return self.names[int(match.lastgroup[1:])] if match else None
+
+
+_headers = _Table(HEADERS)
+_prefixes = _Table(PREFIXES)
+
+
+@functools.lru_cache(maxsize=4096)
+def _identify(filepath, size, mtime):
+    mimetype, encoding = mimetypes.guess_type(filepath)
+    if mimetype != 'text/csv':
+        return None
+
+    filename = path.basename(filepath)
+    if filename.endswith(GRABBER_SUFFIX):
+        name = _prefixes.match(filename)
+        if name:
+            return name
+
+    with open(filepath, 'rb') as fd:
+        head = fd.read(HEAD_BYTES).decode('utf-8-sig', errors='replace')
+    return _headers.match(head)
+
+
+def identify(filepath):
+    """Find the importer for a document.
+
+    Args:
+      filepath: Filesystem path to the document.
+    Returns:
+      The name of the importer handling the document, as returned by
+      its name property, or None if no importer does.
+    """
+    stat = os.stat(filepath)
+    return _identify(filepath, stat.st_size, stat.st_mtime_ns)
@@ -0,0 +1,406 @@
+"""Ingest driver used by import.py.
+
+This is beangulp.Ingest with the extract command replaced by one that
+can spread the identify and extract work for the documents over a
+pool of worker processes and reuses the entries extracted from
+unchanged documents in earlier runs and skips the rows imported by
+earlier runs, or streams very large documents through the hooks to the
+output. The importers and hooks interface is the same as beangulp's.
+"""
+import contextlib
+import cProfile
+import os
+import sys
+import tempfile
+
+import click
+import beangulp
+from beancount import loader
+from beangulp import exceptions
+from beangulp import extract
+from beangulp import identify
+from beangulp import utils
+
+from ingest import cache
+from ingest import ledger
+from ingest import metrics
+from ingest import parallel
+from ingest import quarantine
+from ingest import stream
+from ingest import watermarks
+
+
+def _walk(file_or_dirs, log, max_size=identify.FILE_TOO_LARGE_THRESHOLD):
+    """List the documents to process, skipping the too large ones."""
+    filenames = []
+    for filename in utils.walk(file_or_dirs):
+        if max_size is not None and os.path.getsize(filename) > max_size:
+            log(f'* {filename:} ... SKIP')
+            continue
+        filenames.append(filename)
+    return filenames
+
+
+def _load(filename, use_cache=True):
+    """Load the entries of the existing ledger, if any, through the ledger cache."""
+    if not filename:
+        return []
+    if use_cache:
+        return ledger.LedgerCache().load(filename)[0]
+    return loader.load_file(filename)[0]
+
+
+@contextlib.contextmanager
+def _profiled(profiler, filename):
+    """Profile a block with profiler, if not None, and dump the stats to filename."""
+    if profiler is None:
+        yield
+        return
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(filename)
+
+
+def _extract_all(ctx, filenames, existing_entries, output, log, errors, failfast, committed,
+                 jobs, use_cache, profiler, profile_file):
+    """Extract all documents, then run the hooks over them and write them."""
+    extract_cache = cache.ExtractCache() if use_cache else None
+
+    extracted = []
+    with metrics.timed('run', 'extract'), _profiled(profiler, profile_file):
+        for filename, result in parallel.extract_files(ctx.importers, filenames, existing_entries,
+                                                       jobs, extract_cache):
+            log(f'* {filename:}', nl=False)
+            with errors:
+                found = result()
+                if found is None:
+                    log('') # Newline.
+                    continue
+
+                # Signal processing of this document.
+                log(' ...', nl=False)
+
+                index, entries, account = found
+                extracted.append((filename, entries, account, ctx.importers[index]))
+                log(' OK', fg='green')
+
+            if failfast and errors:
+                break
+
+    if extract_cache is not None:
+        extract_cache.evict()
+
+    extracted = _process(ctx, extracted, existing_entries, output, log)
+
+    if committed is not None:
+        for filename, entries, account, importer in extracted:
+            watermarks.advance(committed, account, entries)
+        watermarks.save(committed)
+
+
+def _process(ctx, extracted, existing_entries, output, log):
+    """Sort and deduplicate the extracted entries, run the hooks and write them.
+
+    Returns:
+      The extracted entries, as processed by the hooks.
+    """
+    # Sort.
+    extract.sort_extracted_entries(extracted)
+
+    # Deduplicate. The importers leave this to the hooks, which get the
+    # existing entries without the extracted ones added.
+    for filename, entries, account, importer in extracted:
+        importer.deduplicate(entries, existing_entries)
+
+    # Invoke hooks.
+    for func in ctx.hooks:
+        with metrics.timed('hooks', getattr(func, '__name__', type(func).__name__)):
+            extracted = func(extracted, existing_entries)
+
+    # Report the time spent in the stages of pipeline hooks.
+    for func in ctx.hooks:
+        for name, seconds in getattr(func, 'timings', ()):
+            log(f'  {name:} {seconds * 1000:.1f} ms', 1)
+            metrics.add('stages', name, wall=seconds)
+
+    # Serialize entries.
+    extract.print_extracted_entries(extracted, output)
+    return extracted
+
+
+def _stream(ctx, filenames, existing_entries, output, log, errors, failfast, committed):
+    """Extract, process and write the documents an entry at a time."""
+    stream.prepare(ctx.hooks, existing_entries)
+    header = False
+    for filename in filenames:
+        log(f'* {filename:}', nl=False)
+        with errors:
+            importer = identify.identify(ctx.importers, filename)
+            if importer is None:
+                log('') # Newline.
+                continue
+            log(' ...', nl=False)
+
+            if not header:
+                output.write(extract.HEADER + '\n')
+                header = True
+            account = importer.account(filename)
+            entries = stream.extract(importer, filename, existing_entries)
+            entries = stream.process(ctx.hooks, filename, entries, account, importer,
+                                     existing_entries)
+            if committed is not None:
+                # Advance a copy, merged once the whole document is written,
+                # so a document failing partway does not commit its rows.
+                marks = dict(committed)
+                entries = stream.advancing(marks, account, entries)
+            stream.write(filename, entries, output)
+            if committed is not None:
+                committed.update(marks)
+            log(' OK', fg='green')
+
+        if failfast and errors:
+            break
+
+    if committed is not None:
+        watermarks.save(committed)
+
+
+def _quarantined(records, log):
+    """Store the rows quarantined by a run and summarize them."""
+    if not records:
+        return
+    quarantine.merge(records)
+    log(f'Quarantined {len(records):} rows, stored in {quarantine.FILENAME:}:', fg='yellow')
+    for name, rows, documents in quarantine.summary(records):
+        log(f'  {name:} {rows:} rows of {documents:} documents')
+    log('Extract them again with the extract-quarantined command.')
+
+
+@click.command('extract')
+@click.argument('src', nargs=-1, type=click.Path(exists=True, resolve_path=True))
+@click.option('--output', '-o', type=click.File('w'), default='-',
+              help='Output file.')
+@click.option('--existing', '-e', type=click.Path(exists=True),
+              help='Existing Beancount ledger for de-duplication.')
+@click.option('--reverse', '-r', is_flag=True,
+              help='Sort entries in reverse order.')
+@click.option('--failfast', '-x', is_flag=True,
+              help='Stop processing at the first error.')
+@click.option('--quiet', '-q', count=True,
+              help='Suppress all output.')
+@click.option('--verbose', '-v', count=True,
+              help='Report the time spent in each hook stage.')
+@click.option('--jobs', '-j', type=click.IntRange(min=0), default=1, show_default=True,
+              help='Number of worker processes, 0 for one per CPU.')
+@click.option('--cache/--no-cache', 'use_cache', default=True, show_default=True,
+              help='Reuse the entries extracted from unchanged documents.')
+@click.option('--watermarks/--no-watermarks', 'use_watermarks', default=True, show_default=True,
+              help='Skip the rows imported by earlier runs.')
+@click.option('--commit-watermarks', is_flag=True,
+              help='Move the watermarks past the extracted rows once they are written.')
+@click.option('--metrics', 'metrics_file', type=click.Path(dir_okay=False, writable=True),
+              help='Write timings and counters of the run as JSON to this file.')
+@click.option('--profile', 'profile_file', type=click.Path(dir_okay=False, writable=True),
+              help='Write a cProfile dump of the extraction to this file.')
+@click.option('--stream', 'streaming', is_flag=True,
+              help='Process and write the entries one at a time, in bounded memory.')
+@click.option('--tolerant', is_flag=True,
+              help='Quarantine the rows that do not parse instead of failing their document.')
+@click.pass_obj
+def _extract(ctx, src, output, existing, reverse, failfast, quiet, verbose, jobs, use_cache,
+             use_watermarks, commit_watermarks, metrics_file, profile_file, streaming, tolerant):
+    """Extract transactions from documents.
+
+    Walk the SRC list of files or directories and extract the ledger
+    entries from each file identified by one of the configured
+    importers.  The entries are written to the specified output file
+    or to the standard output in Beancount ledger format in sections
+    associated to the source document.
+
+    With --jobs the documents are identified and extracted in parallel
+    worker processes. The results are merged back in a deterministic
+    order and the hooks run once over the merged list.
+
+    Unless --no-cache is given, the entries extracted from a document
+    are cached and reused for as long as the document, the importer
+    configuration and the importer code are unchanged. The loaded
+    existing ledger is cached as well, and only the changed files of
+    the ledger are parsed again. The caches are emptied with the
+    clear-cache command.
+
+    Unless --no-watermarks is given, the rows of each account up to the
+    last imported date are skipped by the importers supporting it. With
+    --commit-watermarks the watermarks are moved past the extracted rows
+    once they are written, so the next run skips them. Without it a run
+    leaves the watermarks as they are, to preview the entries. The
+    clear-watermarks command makes the next run extract all rows again.
+
+    With --metrics the wall and CPU time and the errors of each
+    document, importer, column parser and hook are recorded, with the
+    counters of the importers, and written as a JSON report. With
+    --profile the extraction is profiled, in this process, so it
+    implies --jobs 1.
+
+    With --stream each document is extracted, passed through the hooks
+    and written an entry at a time, so very large documents are
+    processed in bounded memory. The documents are written in the order
+    in which they are found and their entries in the order of the rows.
+    Documents are not skipped for their size. It implies --jobs 1, and
+    the extracted entries are not cached.
+
+    With --tolerant the rows with a description, date or amount the
+    importers cannot parse are quarantined and the other rows of their
+    document are extracted. The quarantined rows are stored with their
+    raw columns and extracted again with the extract-quarantined
+    command. The documents with quarantined rows are not cached.
+
+    """
+    verbosity = verbose - quiet
+    log = utils.logger(verbosity, err=True)
+    errors = exceptions.ExceptionsTrap(log)
+
+    records = metrics.enable() if metrics_file else None
+    if tolerant:
+        quarantine.enable()
+
+    # Load the ledger, if one is specified.
+    with metrics.timed('run', 'load'):
+        existing_entries = _load(existing, use_cache)
+
+    profiler = None
+    if profile_file:
+        profiler = cProfile.Profile()
+        jobs = 1
+    if streaming:
+        jobs = 1
+        use_cache = False
+
+    # The streaming mode is meant for the documents too large otherwise.
+    filenames = _walk(src, log, None if streaming else identify.FILE_TOO_LARGE_THRESHOLD)
+    marks = watermarks.load() if use_watermarks or commit_watermarks else None
+    for importer in ctx.importers:
+        if hasattr(importer, 'watermarks'):
+            importer.watermarks = marks if use_watermarks else None
+    # The watermarks are advanced on a copy, as the importers skip rows
+    # by the watermarks of the earlier runs.
+    committed = dict(marks) if commit_watermarks else None
+    if streaming:
+        with metrics.timed('run', 'extract'), _profiled(profiler, profile_file):
+            _stream(ctx, filenames, existing_entries, output, log, errors, failfast, committed)
+    else:
+        _extract_all(ctx, filenames, existing_entries, output, log, errors, failfast, committed,
+                     jobs, use_cache, profiler, profile_file)
+
+    if records is not None:
+        metrics.write(records, metrics_file)
+
+    _quarantined(quarantine.drain(), log)
+
+    if errors:
+        sys.exit(1)
+
+
+@click.command('extract-quarantined')
+@click.option('--output', '-o', type=click.File('w'), default='-',
+              help='Output file.')
+@click.option('--existing', '-e', type=click.Path(exists=True),
+              help='Existing Beancount ledger for de-duplication.')
+@click.option('--quiet', '-q', count=True,
+              help='Suppress all output.')
+@click.pass_obj
+def _extract_quarantined(ctx, output, existing, quiet):
+    """Extract the quarantined rows again.
+
+    The rows quarantined by extract --tolerant are extracted by their
+    importer, passed through the hooks and written like the extract
+    command does, with the document and line number they come from.
+    Only these rows are read. The rows that still do not parse stay in
+    quarantine. The watermarks are neither applied nor advanced.
+
+    """
+    log = utils.logger(-quiet, err=True)
+    errors = exceptions.ExceptionsTrap(log)
+
+    records = quarantine.load()
+    if not records:
+        log('No quarantined rows.')
+        return
+    existing_entries = _load(existing)
+    importers = {importer.name: importer for importer in ctx.importers}
+
+    remaining = []
+    extracted = []
+    quarantine.enable()
+    with tempfile.TemporaryDirectory() as directory:
+        for index, ((name, filename), rows) in enumerate(quarantine.documents(records).items()):
+            log(f'* {filename:}', nl=False)
+            importer = importers.get(name)
+            if importer is None:
+                log(f' UNKNOWN IMPORTER {name:}', fg='red')
+                remaining.extend(rows)
+                continue
+            done = False
+            with errors:
+                log(' ...', nl=False)
+                # The rows are written to a document of their own, named
+                # like the original one for the importers that care.
+                subdir = os.path.join(directory, str(index))
+                os.mkdir(subdir)
+                filepath, first = quarantine.write(getattr(importer, 'importer', importer),
+                                                   rows, subdir)
+                entries = extract.extract_from_file(importer, filepath, existing_entries)
+                for record in quarantine.drain():
+                    rows[record['lineno'] - first]['error'] = record['error']
+                    remaining.append(rows[record['lineno'] - first])
+                for entry in entries:
+                    if entry.meta.get('filename') == filepath:
+                        entry.meta['filename'] = filename
+                        entry.meta['lineno'] = rows[entry.meta['lineno'] - first]['lineno']
+                extracted.append((filename, entries, importer.account(filename), importer))
+                done = True
+                log(' OK', fg='green')
+            if not done:
+                quarantine.drain()
+                remaining.extend(rows)
+
+    _process(ctx, extracted, existing_entries, output, log)
+    quarantine.save(remaining)
+    log(f'Extracted {len(records) - len(remaining):} quarantined rows, '
+        f'{len(remaining):} remain in {quarantine.FILENAME:}.')
+
+    if errors:
+        sys.exit(1)
+
+
+@click.command('clear-cache')
+def _clear_cache():
+    """Remove all cached extracted entries and loaded ledgers."""
+    removed = cache.ExtractCache().clear()
+    click.echo(f'Removed {removed:} cached documents.')
+    removed = ledger.LedgerCache().clear()
+    click.echo(f'Removed {removed:} cached ledgers.')
+
+
+@click.command('clear-watermarks')
+@click.argument('accounts', nargs=-1)
+def _clear_watermarks(accounts):
+    """Forget the imported rows of ACCOUNTS, or of all accounts."""
+    marks = watermarks.load()
+    for account in accounts or list(marks):
+        marks.pop(account, None)
+    watermarks.save(marks)
+    click.echo('Cleared the watermarks of ' + (', '.join(accounts) or 'all accounts') + '.')
+
+
+class Ingest(beangulp.Ingest):
+    """beangulp.Ingest with the parallel capable extract command."""
+
+    def __init__(self, importers, hooks=None):
+        super().__init__(importers, hooks)
+        self.cli.add_command(_extract)
+        self.cli.add_command(_extract_quarantined)
+        self.cli.add_command(_clear_cache)
+        self.cli.add_command(_clear_watermarks)
@@ -0,0 +1,380 @@
+"""Automatic postings from the rules of the postprocessor database.
+
+The postprocessor keeps AutoPostingMatcher rules in its db.json file:
+each rule matches transactions with a regular expression on their date,
+payee, narration or amount, or with a composite of rules of which any,
+all or none must match, and lists the postings to add to the matching
+transactions. The AutoPost stage applies the same rules to the
+extracted entries, in the order of the database, the first matching
+rule wins.
+
+Rather than testing each rule in turn, the regular expressions on a
+field are matched together: the longest literal each of them requires
+is looked up in an index of the literals by their first GRAM
+characters in a single scan of the field, and the expressions without
+a literal are first tried as one combined alternation, so a
+transaction costs about one scan per field whatever the number of
+rules. Only the rules using an expression that may match are
+evaluated, in order, running the expressions as needed. Expressions
+with back references are left out of the alternation, which would
+renumber the groups they refer to, and always run on their own.
+
+The regular expressions are the JavaScript ones of the postprocessor,
+interpreted as Python regular expressions, which agree on the common
+syntax. The date is matched in ISO format and the amount is the number
+of the first posting. The lines of the postings are either empty, to
+let Beancount interpolate the amount, or a number and a currency, where
+${transaction.meta.amount}, ${transaction.meta.amount.neg()} and
+${transaction.meta.currency} are substituted.
+"""
+import collections
+import json
+import os
+import re
+from decimal import Decimal
+from os import path
+
+from beancount.core import data
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+# Default location of the postprocessor database.
+FILENAME = path.join(path.dirname(path.dirname(path.abspath(__file__))),
+                     'postprocessor', 'db.json')
+
+# Fields the regular expressions match on.
+FIELDS = ('date', 'payee', 'narration', 'amount')
+
+# Length of the literal prefixes the literals are indexed by.
+GRAM = 4
+
+# Expressions supported in the template lines of the postings.
+TEMPLATES = {
+    'transaction.meta.amount': lambda amount: str(amount.number),
+    'transaction.meta.amount.neg()': lambda amount: str(-amount.number),
+    'transaction.meta.amount.negated()': lambda amount: str(-amount.number),
+    'transaction.meta.currency': lambda amount: amount.currency,
+}
+
+
+class RuleError(ValueError):
+    """An invalid rule, or a transaction violating the expectations of its rule."""
+
+
+def _literal(pattern):
+    """Find the longest literal any match of a regular expression contains.
+
+    Returns:
+      A (literal, exact) tuple, where exact tells whether the expression
+      matches that literal only. The literal is None if there is none.
+    """
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & re.IGNORECASE:
+        return None, False
+    runs, run = [], []
+    exact = True
+    for op, value in parsed:
+        if op is sre_parse.LITERAL:
+            run.append(chr(value))
+            continue
+        exact = False
+        runs.append(''.join(run))
+        run = []
+    runs.append(''.join(run))
+    literal = max(runs, key=len)
+    return (literal, exact) if literal else (None, False)
+
+
+def _references(pattern):
+    """Tell whether a parsed regular expression contains back references."""
+    if isinstance(pattern, sre_parse.SubPattern):
+        return any(op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS) or _references(value)
+                   for op, value in pattern)
+    if isinstance(pattern, (list, tuple)):
+        return any(_references(value) for value in pattern)
+    return False
+
+
+class _Field:
+    """The regular expressions on one field, matched together.
+
+    Args:
+      leaves: A list of (leaf, pattern) tuples.
+    """
+
+    def __init__(self, leaves):
+        # Literals by their prefix, with the leaf and the expression to
+        # confirm the match with, None for the exact literals.
+        self.grams = collections.defaultdict(list)
+        self.short = []
+        # The expressions without literals with back references, always
+        # run on their own.
+        self.separate = []
+        others = []
+        for leaf, pattern in leaves:
+            regex = re.compile(pattern)
+            literal, exact = _literal(pattern)
+            if literal is None:
+                if _references(sre_parse.parse(pattern)):
+                    self.separate.append((leaf, regex))
+                else:
+                    others.append((leaf, regex))
+                continue
+            check = (literal, leaf, None if exact else regex)
+            if len(literal) < GRAM:
+                self.short.append(check)
+            else:
+                self.grams[literal[:GRAM]].append(check)
+        self.grams = dict(self.grams)
+        self.others = others
+        self.combined = None
+        if others:
+            try:
+                self.combined = re.compile('|'.join(f'(?:{regex.pattern})'
+                                                    for leaf, regex in others))
+            except re.error:
+                # Group names or inline flags clash once combined.
+                pass
+
+    def candidates(self, text):
+        """Find the leaves that may match text.
+
+        Returns:
+          A dict mapping the leaves to the expression to confirm the
+          match with, or None for the leaves known to match.
+        """
+        found = {}
+        grams = self.grams
+        if grams:
+            for index in range(len(text) - GRAM + 1):
+                bucket = grams.get(text[index:index + GRAM])
+                if bucket:
+                    for literal, leaf, regex in bucket:
+                        if text.startswith(literal, index):
+                            found[leaf] = regex
+        for literal, leaf, regex in self.short:
+            if literal in text:
+                found[leaf] = regex
+        if self.others and (self.combined is None or self.combined.search(text)):
+            for leaf, regex in self.others:
+                found[leaf] = regex
+        for leaf, regex in self.separate:
+            found[leaf] = regex
+        return found
+
+
+def _evaluate(node, test):
+    if isinstance(node, int):
+        return test(node)
+    kind, children = node
+    if kind == 'any':
+        return any(_evaluate(child, test) for child in children)
+    if kind == 'all':
+        return all(_evaluate(child, test) for child in children)
+    return not any(_evaluate(child, test) for child in children)
+
+
+def _line(name, line):
+    """Parse the line of a posting into a function of the transaction amount."""
+    line = line.strip()
+    if not line:
+        return lambda amount: None
+    parts = re.split(r'\$\{([^}]*)\}', line)
+    for expression in parts[1::2]:
+        if expression.strip() not in TEMPLATES:
+            raise RuleError(f'Rule {name!r}: unsupported expression '
+                            f'${{{expression}}} in "{line}"')
+    def units(amount):
+        text = ''.join(TEMPLATES[part.strip()](amount) if index % 2 else part
+                       for index, part in enumerate(parts))
+        number, _, currency = text.partition(' ')
+        return data.Amount(Decimal(number), currency.strip())
+    return units
+
+
+class Rule:
+    """A compiled AutoPostingMatcher.
+
+    Args:
+      matcher: The rule, as stored in the database.
+      node: The match expression, a leaf number or a (kind, children)
+        tuple for the composite rules.
+    """
+
+    def __init__(self, matcher, node):
+        self.name = matcher['name']
+        self.node = node
+        self.amount_min = matcher.get('expectedAmountMin')
+        self.amount_max = matcher.get('expectedAmountMax')
+        self.currency = matcher.get('expectedCurrency')
+        self.accounts = matcher.get('expectedAccounts') or []
+        self.postings = [(posting['account'], posting.get('flag'),
+                          _line(self.name, posting.get('line', '')))
+                         for posting in matcher.get('postings', [])]
+
+    def validate(self, entry, account, amount):
+        """Raise RuleError if a matched transaction is not as the rule expects."""
+        what = f'Transaction {entry.payee} {entry.narration}'
+        if self.amount_max is not None and amount.number > Decimal(str(self.amount_max)):
+            raise RuleError(f'{what} has amount ({amount.number}) '
+                            f'> expectedAmountMax ({self.amount_max})')
+        if self.amount_min is not None and amount.number < Decimal(str(self.amount_min)):
+            raise RuleError(f'{what} has amount ({amount.number}) '
+                            f'< expectedAmountMin ({self.amount_min})')
+        if self.accounts and account not in self.accounts:
+            raise RuleError(f'{what} is from unexpected account ({account})')
+        if self.currency and amount.currency != self.currency:
+            raise RuleError(f'{what} has unexpected currency '
+                            f'({amount.currency}, expected {self.currency})')
+
+
+class Rules:
+    """The rules of the database, compiled.
+
+    Args:
+      matchers: The list of AutoPostingMatcher rules, in order.
+    """
+
+    def __init__(self, matchers):
+        self.rules = []
+        leaves = {field: [] for field in FIELDS}
+        self._count = 0
+        for matcher in matchers:
+            node = self._compile(matcher, leaves)
+            self.rules.append(Rule(matcher, node))
+        self.fields = {field: _Field(found) for field, found in leaves.items() if found}
+
+        # The rules by the leaves they use, and those which match
+        # when none of their leaves does.
+        self.by_leaf = collections.defaultdict(set)
+        self.always = set()
+        for index, rule in enumerate(self.rules):
+            for leaf in self._leaves(rule.node):
+                self.by_leaf[leaf].add(index)
+            if _evaluate(rule.node, lambda leaf: False):
+                self.always.add(index)
+
+    def _compile(self, matcher, leaves):
+        kind = matcher.get('matchType')
+        options = matcher.get('matchOptions') or {}
+        if kind == 'regex':
+            field = options.get('matchOn')
+            if field not in leaves:
+                raise RuleError(f'Rule {matcher.get("name")!r}: cannot match on {field!r}')
+            leaf = self._count
+            self._count += 1
+            leaves[field].append((leaf, options['regex']))
+            return leaf
+        if kind == 'composite':
+            if options.get('matchType') not in ('any', 'all', 'none'):
+                raise RuleError(f'Rule {matcher.get("name")!r}: '
+                                f'unknown composite {options.get("matchType")!r}')
+            return options['matchType'], [self._compile(child, leaves)
+                                          for child in options.get('matchers', [])]
+        raise RuleError(f'Rule {matcher.get("name")!r}: not implemented ({kind})')
+
+    def _leaves(self, node):
+        if isinstance(node, int):
+            yield node
+            return
+        for child in node[1]:
+            yield from self._leaves(child)
+
+    @classmethod
+    def load(cls, filename=FILENAME):
+        """Load the rules of a postprocessor database, if it exists."""
+        try:
+            with open(filename) as fd:
+                db = json.load(fd)
+        except FileNotFoundError:
+            return cls([])
+        return cls(db.get('autoPostingMatchers', []))
+
+    def match(self, values):
+        """Find the first rule matching the values of the fields.
+
+        The expressions of the candidate leaves are only run as the
+        candidate rules are evaluated, in order, up to the first match.
+
+        Args:
+          values: A dict mapping field names to strings.
+        Returns:
+          A Rule instance or None.
+        """
+        pending = {}
+        for field, index in self.fields.items():
+            text = values[field]
+            for leaf, regex in index.candidates(text).items():
+                pending[leaf] = regex, text
+        known = {}
+
+        def test(leaf):
+            result = known.get(leaf)
+            if result is None:
+                if leaf in pending:
+                    regex, text = pending[leaf]
+                    result = regex is None or regex.search(text) is not None
+                else:
+                    result = False
+                known[leaf] = result
+            return result
+
+        candidates = set(self.always)
+        for leaf in pending:
+            candidates |= self.by_leaf[leaf]
+        for index in sorted(candidates):
+            rule = self.rules[index]
+            if _evaluate(rule.node, test):
+                return rule
+        return None
+
+
+class AutoPost:
+    """Pipeline stage adding the postings of the matching rule to transactions.
+
+    Transactions that already have more than one posting are left
+    alone. A matched transaction outside of the expected amounts,
+    accounts or currency of its rule raises RuleError.
+
+    Args:
+      filename: The postprocessor database file.
+    """
+
+    def __init__(self, filename=FILENAME):
+        self.filename = filename
+        self._stamp = None
+        self._rules = Rules([])
+
+    def prepare(self, ledger_entries, streaming=False):
+        """Load the rules, again only if the database changed."""
+        try:
+            stat = os.stat(self.filename)
+            stamp = stat.st_mtime_ns, stat.st_size
+        except OSError:
+            stamp = None
+        if stamp != self._stamp:
+            self._rules = Rules.load(self.filename)
+            self._stamp = stamp
+
+    def __call__(self, entries):
+        rules = self._rules
+        for entry in entries:
+            if rules.rules and isinstance(entry, data.Transaction) and len(entry.postings) == 1:
+                posting = entry.postings[0]
+                amount = posting.units
+                rule = rules.match({
+                    'date': entry.date.isoformat(),
+                    'payee': entry.payee or '',
+                    'narration': entry.narration or '',
+                    'amount': str(amount.number),
+                })
+                if rule is not None:
+                    rule.validate(entry, posting.account, amount)
+                    entry = entry._replace(postings=entry.postings + [
+                        data.Posting(account, units(amount), None, None, flag, None)
+                        for account, flag, units in rule.postings])
+            yield entry
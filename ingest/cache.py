@@ -0,0 +1,183 @@
+"""Persistent cache of extracted entries.
+
+Extracting a document again gives the same entries as long as neither
+the document, nor the importer configuration, nor the importer code
+changed. The cache keys the extracted entries on the hash of the
+document contents, the importer name and configuration, and a hash of
+the source code of the package the importer lives in and of the
+packages of PACKAGES, so unchanged documents are not parsed again on
+the next run.
+
+The importers are assumed not to depend on the existing entries for
+extraction, which holds for the csvbase based importers. The cache is
+bounded in size: once it grows beyond its maximum size the least
+recently used entries are removed.
+"""
+import contextlib
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from importlib import metadata
+from os import path
+
+
+# Default location of the cache directory.
+CACHEDIR = path.join(os.environ.get('XDG_CACHE_HOME') or path.expanduser('~/.cache'),
+                     'beancount-support', 'extract')
+
+# Default maximum size of the cache in bytes.
+MAX_SIZE = 256 * 1024 * 1024
+
+# Packages the extraction depends on besides the package of the
+# importer: importers.base reads through the watermarks, quarantine
+# and metrics modules of ingest.
+PACKAGES = ('ingest', )
+
+
+@functools.lru_cache(maxsize=None)
+def _code_version(module):
+    """Hash of the source code of the package containing a module."""
+    digest = hashlib.sha256()
+    try:
+        digest.update(metadata.version('beangulp').encode())
+    except metadata.PackageNotFoundError:
+        pass
+    package = sys.modules[module.partition('.')[0]]
+    root = path.dirname(package.__file__)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                filepath = path.join(dirpath, filename)
+                digest.update(path.relpath(filepath, root).encode())
+                with open(filepath, 'rb') as fd:
+                    digest.update(fd.read())
+    return digest.hexdigest()
+
+
+def _sha256sum(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as fd:
+        for chunk in iter(lambda: fd.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractCache:
+    """On disk cache of extracted entries.
+
+    Args:
+      directory: Directory where the cached entries are stored.
+      max_size: Maximum total size of the cached entries in bytes.
+    """
+
+    def __init__(self, directory=CACHEDIR, max_size=MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, importer, filepath):
+        """Compute the cache key for a document.
+
+        Args:
+          importer: The importer instance handling the document.
+          filepath: Filesystem path to the document.
+        Returns:
+          A string, the cache key.
+        """
+        account = importer.account(filepath)
+        marks = getattr(importer, 'watermarks', None) or {}
+        # The rows of documents with an account column go to sub-accounts
+        # of the account of the document, each with its own watermark.
+        config = (
+            importer.name,
+            account,
+            getattr(importer, 'currency', None),
+            getattr(importer, 'flag', None),
+            sorted((name, mark) for name, mark in marks.items()
+                   if name == account or name.startswith(account + ':')),
+        )
+        digest = hashlib.sha256()
+        digest.update(_sha256sum(filepath).encode())
+        digest.update(repr(config).encode())
+        for package in (type(importer).__module__, *PACKAGES):
+            digest.update(_code_version(package).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return path.join(self.directory, key + '.pickle')
+
+    def get(self, key, filepath):
+        """Look up the entries extracted from a document.
+
+        Args:
+          key: The cache key for the document.
+          filepath: Filesystem path to the document. The same contents
+            may have been extracted from another path, the metadata of
+            the returned entries is updated to point to this one.
+        Returns:
+          The cached entries or None.
+        """
+        cachepath = self._path(key)
+        try:
+            with open(cachepath, 'rb') as fd:
+                entries = pickle.load(fd)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        # Mark as recently used.
+        os.utime(cachepath)
+        for entry in entries:
+            if entry.meta.get('filename', filepath) != filepath:
+                entry.meta['filename'] = filepath
+        return entries
+
+    def put(self, key, entries):
+        """Store the entries extracted from a document.
+
+        Args:
+          key: The cache key for the document.
+          entries: The extracted entries.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first, the cache may be shared by
+        # concurrent worker processes.
+        fd, tmppath = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                pickle.dump(entries, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmppath, self._path(key))
+        except BaseException:
+            os.unlink(tmppath)
+            raise
+
+    def _files(self):
+        try:
+            return [entry for entry in os.scandir(self.directory)
+                    if entry.is_file() and entry.name.endswith('.pickle')]
+        except FileNotFoundError:
+            return []
+
+    def evict(self):
+        """Remove the least recently used entries beyond the maximum size."""
+        files = [(entry.stat(), entry.path) for entry in self._files()]
+        files.sort(key=lambda item: item[0].st_mtime, reverse=True)
+        size = 0
+        for stat, filepath in files:
+            size += stat.st_size
+            if size > self.max_size:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(filepath)
+
+    def clear(self):
+        """Remove all entries.
+
+        Returns:
+          The number of entries removed.
+        """
+        files = self._files()
+        for entry in files:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(entry.path)
+        return len(files)
@@ -0,0 +1,222 @@
+"""Duplicate detection against an index of the existing ledger.
+
+beangulp compares each extracted transaction with every existing
+transaction dated within a few days of it, which on a ledger spanning
+many years dominates the extract time. The Deduplicate stage instead
+looks up the extracted transactions in an index of the ledger:
+
+- by the account and the transaction id of the bank, for the entries
+  carrying one in their TRANSACTION_ID metadata, and
+
+- by (account, date, number, currency) of each posting, for dates
+  within WINDOW days, refined by the similarity of payee and narration,
+  preferring the candidates of the same date.
+
+An existing transaction is the duplicate of at most one extracted
+transaction, so two identical purchases on the same day are not both
+discarded because one of them is already in the ledger. The index is
+built once per run and stored next to the extract cache, keyed on the
+ledger files and their modification times, so unchanged ledgers do not
+need to be indexed again.
+"""
+import collections
+import datetime
+import difflib
+import hashlib
+import os
+import pickle
+import tempfile
+from os import path
+
+from beancount.core import data
+from beangulp import extract
+
+
+# Default location of the stored indexes.
+CACHEDIR = path.join(os.environ.get('XDG_CACHE_HOME') or path.expanduser('~/.cache'),
+                     'beancount-support', 'dedup')
+
+# Metadata key of the transaction id assigned by the bank.
+TRANSACTION_ID = 'transaction_id'
+
+# Number of days the date of a duplicate may differ from the original.
+WINDOW = 2
+
+# Minimum similarity of payee and narration for a duplicate, between 0
+# and 1. Two purchases of the same amount on the same day at different
+# shops are not duplicates.
+MIN_SIMILARITY = 0.5
+
+# Version of the stored index format.
+VERSION = 1
+
+
+def _keys(entry):
+    """The (account, number, currency) of each posting with units."""
+    for posting in entry.postings:
+        units = posting.units
+        if units is not None and units.number is not None:
+            yield posting.account, units.number, units.currency
+
+
+def _id(entry):
+    """The (account, transaction id) of an entry, or None."""
+    transaction_id = entry.meta.get(TRANSACTION_ID)
+    if transaction_id and entry.postings:
+        return entry.postings[0].account, transaction_id
+    return None
+
+
+def _text(entry):
+    return f'{entry.payee or ""} {entry.narration or ""}'.lower()
+
+
+class Index:
+    """Positions of the transactions of a ledger by id and by posting.
+
+    Args:
+      entries: The list of directives of the ledger.
+    """
+
+    def __init__(self, entries):
+        self.ids = {}
+        self.postings = collections.defaultdict(list)
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, data.Transaction):
+                continue
+            key = _id(entry)
+            if key is not None:
+                self.ids[key] = position
+            for account, number, currency in _keys(entry):
+                self.postings[(account, entry.date, number, currency)].append(position)
+        self.postings = dict(self.postings)
+
+
+def _fingerprint(entries):
+    """Identify a ledger by its files, their modification times and sizes."""
+    files = []
+    for filename in sorted({entry.meta.get('filename') for entry in entries} - {None}):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            continue
+        files.append((filename, stat.st_mtime_ns, stat.st_size))
+    return VERSION, len(entries), tuple(files)
+
+
+class Deduplicate:
+    """Pipeline stage marking the extracted duplicates of ledger entries.
+
+    Duplicates are marked like beangulp does, setting their
+    '__duplicate__' metadata to the existing entry, and are printed
+    commented out.
+
+    Args:
+      directory: Directory in which the ledger index is stored, or None
+        to build it on every run.
+    """
+
+    def __init__(self, directory=CACHEDIR):
+        self.directory = directory
+        self._entries = []
+        self._index = Index([])
+        self._extracted = collections.defaultdict(list)
+        self._used = set()
+        self._streaming = False
+
+    def _load(self, ledger_entries):
+        fingerprint = _fingerprint(ledger_entries)
+        filenames = [filename for filename, mtime, size in fingerprint[2]]
+        name = hashlib.sha256(repr(filenames).encode()).hexdigest() + '.pickle'
+        filepath = path.join(self.directory, name)
+        try:
+            with open(filepath, 'rb') as fd:
+                stored, index = pickle.load(fd)
+            if stored == fingerprint:
+                return index
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+
+        index = Index(ledger_entries)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmppath = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as tmp:
+            pickle.dump((fingerprint, index), tmp, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmppath, filepath)
+        return index
+
+    def prepare(self, ledger_entries, streaming=False):
+        """Index the existing ledger, once per run.
+
+        In streaming mode the extracted entries are not kept to check
+        the later documents against, as their number is not bounded.
+        """
+        ledger_entries = ledger_entries or []
+        if self.directory is None or not ledger_entries:
+            index = Index(ledger_entries)
+        else:
+            index = self._load(ledger_entries)
+        self._entries = ledger_entries
+        self._index = index
+        self._streaming = streaming
+        self._extracted.clear()
+        self._used.clear()
+
+    def _candidates(self, entry):
+        """Yield the existing and the earlier extracted entries matching entry."""
+        for account, number, currency in _keys(entry):
+            for delta in range(-WINDOW, WINDOW + 1):
+                key = (account, entry.date + datetime.timedelta(days=delta), number, currency)
+                for position in self._index.postings.get(key, ()):
+                    yield self._entries[position]
+                yield from self._extracted.get(key, ())
+
+    def find(self, entry):
+        """Find the entry an extracted transaction duplicates.
+
+        Args:
+          entry: An extracted Transaction.
+        Returns:
+          The existing or earlier extracted entry it duplicates, or None.
+        """
+        transaction_id = entry.meta.get(TRANSACTION_ID)
+        key = _id(entry)
+        if key is not None:
+            position = self._index.ids.get(key)
+            if position is not None:
+                return self._entries[position]
+
+        best, best_score = None, 0.0
+        text = _text(entry)
+        for candidate in self._candidates(entry):
+            if id(candidate) in self._used:
+                continue
+            other_id = candidate.meta.get(TRANSACTION_ID)
+            if transaction_id and other_id and other_id != transaction_id:
+                continue
+            score = difflib.SequenceMatcher(None, text, _text(candidate)).ratio()
+            if score < MIN_SIMILARITY:
+                continue
+            # Of the similar candidates those of the same day come first.
+            if candidate.date == entry.date:
+                score += 1
+            if best is None or score > best_score:
+                best, best_score = candidate, score
+        return best
+
+    def __call__(self, entries):
+        found = []
+        for entry in entries:
+            if isinstance(entry, data.Transaction) and not entry.meta.get(extract.DUPLICATE):
+                duplicate = self.find(entry)
+                if duplicate is not None:
+                    self._used.add(id(duplicate))
+                    entry.meta[extract.DUPLICATE] = duplicate
+                elif not self._streaming:
+                    found.append(entry)
+            yield entry
+
+        # Later documents are checked against the entries of this one.
+        for entry in found:
+            for account, number, currency in _keys(entry):
+                self._extracted[(account, entry.date, number, currency)].append(entry)
@@ -0,0 +1,274 @@
+"""Persistent cache of the loaded existing ledger.
+
+Loading the ledger the extracted entries are deduplicated against
+parses all its files, books the transactions, runs the plugins and
+validates the result, which takes seconds on a ledger of many years.
+LedgerCache.load() returns the same (entries, errors, options_map)
+triple as beancount.loader.load_file() from two levels of cache:
+
+- the loaded ledger, reused as long as none of its files and of the
+  source files of its plugin modules changed, judged by their
+  modification time and size or, when only those changed, by the hash
+  of their contents, and as long as its include globs match the same
+  files, and
+
+- the parsed directives of each file, keyed by the hash of its
+  contents, so when one include changes only that file is parsed
+  again before the booking, plugins and validation run over the whole
+  ledger, which span files and are not cached separately.
+
+The garbage collector is paused while unpickling, as it otherwise
+walks the growing heap of directives over and over.
+"""
+import contextlib
+import gc
+import glob
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from os import path
+
+from beancount import loader
+from beancount.core import data
+from beancount.ops import validation
+from beancount.parser import booking
+from beancount.parser import options
+from beancount.parser import parser
+from beancount.utils import encryption
+
+from ingest.cache import _sha256sum
+
+
+# Default location of the cache directory.
+CACHEDIR = path.join(os.environ.get('XDG_CACHE_HOME') or path.expanduser('~/.cache'),
+                     'beancount-support', 'ledger')
+
+# Version of the stored formats.
+VERSION = 2
+
+
+class _Uncacheable(Exception):
+    """The ledger includes encrypted files, which are not cached."""
+
+
+def _stat(filename):
+    stat = os.stat(filename)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@contextlib.contextmanager
+def _paused_gc():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _read(filepath):
+    try:
+        with open(filepath, 'rb') as fd, _paused_gc():
+            return pickle.load(fd)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError):
+        return None
+
+
+def _write(filepath, value):
+    directory = path.dirname(filepath)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmppath = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            pickle.dump(value, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmppath, filepath)
+    except BaseException:
+        os.unlink(tmppath)
+        raise
+
+
+def _name(filename):
+    return hashlib.sha256(filename.encode()).hexdigest()
+
+
+def _digest(filename):
+    return (*_stat(filename), _sha256sum(filename))
+
+
+def _globs(globs):
+    """Tell whether the include globs of a cached ledger match the same files."""
+    return all(sorted(glob.glob(pattern, recursive=True)) == matched
+               for pattern, matched in globs.items())
+
+
+def _plugins(options_map, digests):
+    """Add the source files of the plugin modules a ledger loaded to digests."""
+    for name, config in options_map['plugin']:
+        module = sys.modules.get(loader.RENAMED_MODULES.get(name, name))
+        filename = getattr(module, '__file__', None)
+        if filename and path.exists(filename):
+            digests[filename] = _digest(filename)
+
+
+class LedgerCache:
+    """On disk cache of loaded ledgers.
+
+    Args:
+      directory: Directory where the loaded ledgers and the parsed files
+        are stored.
+    """
+
+    def __init__(self, directory=CACHEDIR):
+        self.directory = directory
+
+    def _files(self, files):
+        """Check the files of a cached ledger.
+
+        Args:
+          files: A dict mapping the file names to (mtime, size, digest).
+        Returns:
+          The dict with the times of the files updated, if they changed
+          while their contents did not, or None if any file changed.
+        """
+        current = {}
+        for filename, (mtime, size, digest) in files.items():
+            try:
+                stat = _stat(filename)
+            except OSError:
+                return None
+            if stat != (mtime, size):
+                if stat[1] != size or _sha256sum(filename) != digest:
+                    return None
+            current[filename] = (*stat, digest)
+        return current
+
+    def _parse_file(self, filename, digests):
+        """Parse a file, from the cache if its contents did not change."""
+        if encryption.is_encrypted_file(filename):
+            raise _Uncacheable(filename)
+        digests[filename] = _digest(filename)
+        digest = digests[filename][2]
+        cachepath = path.join(self.directory, 'files', _name(filename) + '.pickle')
+        cached = _read(cachepath)
+        if cached is not None and cached[:2] == (VERSION, digest):
+            return cached[2]
+        result = parser.parse_file(filename)
+        _write(cachepath, (VERSION, digest, result))
+        return result
+
+    def _parse(self, filename, digests, globs):
+        """Parse a ledger and its includes, like beancount's loader does.
+
+        The include globs are added to globs with the files they matched.
+        """
+        entries = []
+        parse_errors = []
+        options_map = None
+        other_options_map = []
+        sources = [path.normpath(path.abspath(filename))]
+        seen = set()
+        while sources:
+            filename = sources.pop(0)
+            if filename in seen:
+                parse_errors.append(loader.LoadError(
+                    data.new_metadata('<load>', 0), f'Duplicate filename parsed: "{filename}"'))
+                continue
+            if not path.exists(filename):
+                parse_errors.append(loader.LoadError(
+                    data.new_metadata('<load>', 0), f'File "{filename}" does not exist'))
+                continue
+            seen.add(filename)
+            src_entries, src_errors, src_options_map = self._parse_file(filename, digests)
+            entries.extend(src_entries)
+            parse_errors.extend(src_errors)
+            if options_map is None:
+                options_map = src_options_map
+            else:
+                other_options_map.append(src_options_map)
+
+            cwd = path.dirname(filename)
+            for include in src_options_map['include']:
+                pattern = path.join(cwd, include)
+                matched = glob.glob(pattern, recursive=True)
+                globs[pattern] = sorted(matched)
+                if not matched:
+                    parse_errors.append(loader.LoadError(
+                        data.new_metadata('<load>', 0),
+                        f'File glob "{include}" does not match any files'))
+                sources.extend(path.normpath(path.join(cwd, name)) for name in matched)
+
+        if options_map is None:
+            options_map = options.OPTIONS_DEFAULTS.copy()
+        options_map['include'] = sorted(seen)
+        options_map = loader.aggregate_options_map(options_map, other_options_map)
+        return entries, parse_errors, options_map
+
+    def _load(self, filename, digests, globs):
+        """Load a ledger like beancount.loader._load() does, parsing through the cache."""
+        entries, parse_errors, options_map = self._parse(filename, digests, globs)
+        entries.sort(key=data.entry_sortkey)
+        entries, balance_errors = booking.book(entries, options_map)
+        parse_errors.extend(balance_errors)
+        saved_pythonpath = list(sys.path)
+        try:
+            sys.path[0:0] = options_map.get('pythonpath', [])
+            entries, errors = loader.run_transformations(entries, parse_errors, options_map, None)
+        finally:
+            sys.path[:] = saved_pythonpath
+        _plugins(options_map, digests)
+        errors.extend(validation.validate(entries, options_map, None, None))
+        options_map['input_hash'] = loader.compute_input_hash(options_map['include'])
+        return entries, errors, options_map
+
+    def load(self, filename):
+        """Load a ledger.
+
+        Args:
+          filename: The top level file of the ledger.
+        Returns:
+          An (entries, errors, options_map) tuple.
+        """
+        filename = path.normpath(path.abspath(filename))
+        base = path.join(self.directory, _name(filename))
+        stored = _read(base + '.files')
+        if stored is not None and stored[0] == VERSION:
+            _, files, globs = stored
+            current = self._files(files) if _globs(globs) else None
+            if current is not None:
+                result = _read(base + '.pickle')
+                if result is not None:
+                    if current != files:
+                        _write(base + '.files', (VERSION, current, globs))
+                    return result
+
+        digests = {}
+        globs = {}
+        try:
+            result = self._load(filename, digests, globs)
+        except _Uncacheable:
+            return loader.load_file(filename)
+        _write(base + '.pickle', result)
+        _write(base + '.files', (VERSION, digests, globs))
+        return result
+
+    def clear(self):
+        """Remove all cached ledgers and files.
+
+        Returns:
+          The number of ledgers removed.
+        """
+        removed = 0
+        for directory in (self.directory, path.join(self.directory, 'files')):
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.is_file():
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(entry.path)
+                    removed += entry.name.endswith('.files')
+        return removed
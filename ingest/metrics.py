@@ -0,0 +1,112 @@
+"""Opt-in instrumentation of the extract run.
+
+When enabled, the extract command records the wall and CPU time, the
+number of calls and the number of exceptions raised for the
+identification and the extraction of each document, for each column
+parser of the importers and for each hook, plus named counters bumped
+by the importers, like the number of rows read or of narrations that
+needed a fallback parser. The worker processes send their records back
+with the results, and the merged records are written as a JSON report
+at the end of the run.
+
+All functions of this module do nothing while instrumentation is not
+enabled, so the importers can call them unconditionally.
+"""
+import collections
+import contextlib
+import json
+import time
+
+
+class Metrics:
+    """Records of a run, by section and name."""
+
+    def __init__(self):
+        self.sections = {}
+        self.counters = collections.Counter()
+
+    def add(self, section, name, **values):
+        """Accumulate numeric values and set the others on a record."""
+        record = self.sections.setdefault(section, {}).setdefault(name, {})
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                record[key] = record.get(key, 0) + value
+            else:
+                record[key] = value
+
+    @contextlib.contextmanager
+    def timed(self, section, name, **values):
+        """Time a block and add it as a call to a record."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        errors = 0
+        try:
+            yield
+        except BaseException:
+            errors = 1
+            raise
+        finally:
+            self.add(section, name, calls=1, errors=errors,
+                     wall=time.perf_counter() - wall, cpu=time.process_time() - cpu, **values)
+
+    def merge(self, other):
+        """Merge the records of another Metrics instance into this one."""
+        for section, records in other.sections.items():
+            for name, values in records.items():
+                self.add(section, name, **values)
+        self.counters.update(other.counters)
+
+    def report(self):
+        """Return the records as a JSON serializable dict.
+
+        The extract records are also summed by importer.
+        """
+        importers = {}
+        for values in self.sections.get('extract', {}).values():
+            name = values.get('importer')
+            if name is None:
+                continue
+            summary = importers.setdefault(name, {})
+            for key in ('calls', 'errors', 'wall', 'cpu', 'entries', 'cached'):
+                summary[key] = summary.get(key, 0) + values.get(key, 0)
+        return {**self.sections, 'importers': importers, 'counters': dict(self.counters)}
+
+
+# The records of the current process, None while not enabled.
+current = None
+
+
+def enable():
+    """Start recording in this process."""
+    global current
+    current = Metrics()
+    return current
+
+
+def add(section, name, **values):
+    if current is not None:
+        current.add(section, name, **values)
+
+
+def count(name, value=1):
+    if current is not None:
+        current.counters[name] += value
+
+
+def timed(section, name, **values):
+    if current is None:
+        return contextlib.nullcontext()
+    return current.timed(section, name, **values)
+
+
+def drain():
+    """Return the records of this process so far and start afresh."""
+    global current
+    if current is None:
+        return None
+    records, current = current, Metrics()
+    return records
+
+
+def write(metrics, filename):
+    with open(filename, 'w') as fd:
+        json.dump(metrics.report(), fd, indent=2, sort_keys=True)
@@ -0,0 +1,121 @@
+"""Identify and extract documents, optionally over a process pool.
+
+Each document is handled as an independent task: identification and
+extraction both run in the worker. Results are handed back in the
+order in which the documents were submitted, so the output of a run
+does not depend on how the tasks were scheduled.
+"""
+import functools
+import os
+from concurrent import futures
+
+from beangulp import extract, identify
+
+from ingest import metrics
+from ingest import quarantine
+
+
+def extract_file(importers, filename, existing_entries, cache=None):
+    """Identify a document and extract its entries.
+
+    Args:
+      importers: List of importer instances.
+      filename: Filesystem path to the document.
+      existing_entries: Existing entries.
+      cache: An ingest.cache.ExtractCache instance or None.
+    Returns:
+      None if no importer matched the document, otherwise an (index,
+      entries, account) tuple where index is the position in importers
+      of the importer that handled the document.
+    """
+    with metrics.timed('identify', filename):
+        importer = identify.identify(importers, filename)
+    if importer is None:
+        return None
+    with metrics.timed('extract', filename, importer=importer.name):
+        if cache is None:
+            entries = extract.extract_from_file(importer, filename, existing_entries)
+        else:
+            key = cache.key(importer, filename)
+            entries = cache.get(key, filename)
+            if entries is None:
+                pending = quarantine.pending()
+                entries = extract.extract_from_file(importer, filename, existing_entries)
+                # The rows quarantined would be missing from the cached entries.
+                if quarantine.pending() == pending:
+                    cache.put(key, entries)
+            else:
+                metrics.add('extract', filename, cached=1)
+    metrics.add('extract', filename, entries=len(entries))
+    return importers.index(importer), entries, importer.account(filename)
+
+
+# Per worker process state, set up once by _initializer().
+_importers = None
+_existing_entries = None
+_cache = None
+
+
+def _initializer(importers, existing_entries, cache, instrumented, tolerant):
+    global _importers, _existing_entries, _cache
+    _importers = importers
+    _existing_entries = existing_entries
+    _cache = cache
+    if instrumented:
+        metrics.enable()
+    if tolerant:
+        quarantine.enable()
+
+
+def _extract_file(filename):
+    # The records and the quarantined rows of the worker go back with
+    # the result. Those of a failed task go back with the next result
+    # of the same worker.
+    result = extract_file(_importers, filename, _existing_entries, _cache)
+    return result, metrics.drain(), quarantine.drain()
+
+
+def _result(task):
+    result, records, quarantined = task.result()
+    if records is not None:
+        metrics.current.merge(records)
+    if quarantined is not None:
+        quarantine.current.extend(quarantined)
+    return result
+
+
+def extract_files(importers, filenames, existing_entries, jobs=1, cache=None):
+    """Extract a list of documents.
+
+    Args:
+      importers: List of importer instances.
+      filenames: List of filesystem paths to the documents.
+      existing_entries: Existing entries.
+      jobs: Number of worker processes. With 1 everything runs in the
+        current process, with 0 one worker per CPU is started.
+      cache: An ingest.cache.ExtractCache instance or None.
+    Yields:
+      (filename, result) pairs in the order of filenames, where result
+      is a callable returning the extract_file() value for the document
+      or raising the exception the extraction raised.
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(filenames))
+
+    if jobs <= 1:
+        for filename in filenames:
+            yield filename, functools.partial(extract_file, importers, filename, existing_entries, cache)
+        return
+
+    pool = futures.ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_initializer,
+        initargs=(importers, existing_entries, cache, metrics.current is not None,
+                  quarantine.current is not None))
+    try:
+        tasks = [pool.submit(_extract_file, filename) for filename in filenames]
+        for filename, task in zip(filenames, tasks):
+            yield filename, functools.partial(_result, task)
+    finally:
+        pool.shutdown(cancel_futures=True)
@@ -0,0 +1,100 @@
+"""Import hooks composed of small stages.
+
+A stage is a function taking an iterable of directives and returning
+an iterable of directives, usually a generator. The stages of a
+pipeline are chained lazily, so each entry passes through all of them
+before the next one is read and adding a stage does not add a copy of
+the list of entries. Stages are expected to pass entries they do not
+modify through unchanged instead of copying them.
+
+A stage that needs the existing ledger can define a prepare() method,
+which is called with the existing entries once per run of the hook,
+before any entry goes through the stage.
+
+The streaming extract mode calls Pipeline.prepare() once, then run() over
+the entries of each document as they are extracted. The prepare() method
+of the stages then gets streaming=True, telling them not to hold on to
+the entries of the earlier documents, so memory use stays bounded.
+"""
+import time
+
+
+class Pipeline:
+    """An import hook running a sequence of stages over the entries.
+
+    Args:
+      stages: The stage functions, in the order in which they run.
+    """
+
+    def __init__(self, *stages):
+        self.stages = stages
+        # Accumulated time spent in each stage and its upstream stages.
+        self._inclusive = [0.0] * len(stages)
+
+    def _timed(self, index, entries):
+        clock = time.perf_counter
+        iterator = iter(entries)
+        elapsed = 0.0
+        try:
+            while True:
+                start = clock()
+                try:
+                    entry = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += clock() - start
+                yield entry
+        finally:
+            self._inclusive[index] += elapsed
+
+    @property
+    def timings(self):
+        """A list of (stage name, seconds) pairs, the time spent in each stage."""
+        timings = []
+        upstream = 0.0
+        for stage, inclusive in zip(self.stages, self._inclusive):
+            name = getattr(stage, '__name__', type(stage).__name__)
+            timings.append((name, inclusive - upstream))
+            upstream = inclusive
+        return timings
+
+    def prepare(self, ledger_entries, streaming=False):
+        """Prepare the stages for a run over the entries of all documents."""
+        for stage in self.stages:
+            prepare = getattr(stage, 'prepare', None)
+            if prepare is None:
+                continue
+            if streaming:
+                prepare(ledger_entries, streaming=True)
+            else:
+                prepare(ledger_entries)
+
+    def run(self, entries):
+        """Run the stages over a list of entries.
+
+        Args:
+          entries: An iterable of directives.
+        Returns:
+          An iterator over the processed directives.
+        """
+        for index, stage in enumerate(self.stages):
+            entries = self._timed(index, stage(entries))
+        return entries
+
+    def __call__(self, extracted_entries_list, ledger_entries):
+        """Run the stages over the entries extracted from each document.
+
+        Args:
+          extracted_entries_list: A list of (filename, entries, account,
+            importer) tuples, where 'entries' are the directives
+            extracted from 'filename'.
+          ledger_entries: If provided, a list of directives from the
+            existing ledger of the user.
+        Returns:
+          A list of (filename, entries, account, importer) tuples with
+          the processed entries, to be printed.
+        """
+        self.prepare(ledger_entries)
+        return [(filename, list(self.run(entries)), account, importer)
+                for filename, entries, account, importer in extracted_entries_list]
@@ -0,0 +1,194 @@
+"""Prediction of the contra account of the extracted transactions.
+
+The Predict stage learns from the two posting transactions of the
+existing ledger which account the other posting of a transaction goes
+to, given the account of its first posting and the words of its payee
+and narration, and adds that posting to the extracted transactions
+that have a single one, flagged and with the confidence of the
+prediction in its metadata, for review.
+
+The model is an inverted index mapping each (account, token) pair to
+the number of transactions of each contra account. It is stored next
+to the extract cache with the count of each distinct (payee, narration,
+accounts) of the ledger it was built from, so the next run only indexes
+the transactions added to the ledger since, and removes those deleted.
+A prediction looks up the few tokens of a transaction, so it does not
+depend on the size of the ledger.
+"""
+import collections
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+from decimal import Decimal
+from os import path
+
+from beancount.core import data
+from beangulp import extract
+
+
+# Default location of the stored indexes.
+CACHEDIR = path.join(os.environ.get('XDG_CACHE_HOME') or path.expanduser('~/.cache'),
+                     'beancount-support', 'predict')
+
+# Metadata key of the confidence of a predicted posting.
+CONFIDENCE = 'confidence'
+
+# Minimum confidence of the predictions added to the transactions.
+MIN_CONFIDENCE = Decimal('0.5')
+
+# Version of the stored index format.
+VERSION = 1
+
+_token = re.compile(r'[^\W\d_]{2,}')
+
+
+def tokens(payee, narration):
+    """The distinct words of the payee and narration of a transaction."""
+    return frozenset(_token.findall(f'{payee or ""} {narration or ""}'.lower()))
+
+
+def _key(entry):
+    """What the index learns from a transaction, None for the ones it does not use."""
+    if len(entry.postings) != 2:
+        return None
+    first, second = entry.postings
+    if first.account == second.account:
+        return None
+    return entry.payee or '', entry.narration or '', first.account, second.account
+
+
+class Index:
+    """Counts of the contra accounts by account and token."""
+
+    def __init__(self):
+        self.version = VERSION
+        self.keys = collections.Counter()
+        self.accounts = {}
+
+    def _add(self, key, count):
+        payee, narration, first, second = key
+        words = tokens(payee, narration)
+        for account, contra in ((first, second), (second, first)):
+            counts = self.accounts.setdefault(account, {})
+            for word in words:
+                contras = counts.setdefault(word, collections.Counter())
+                contras[contra] += count
+                if contras[contra] <= 0:
+                    del contras[contra]
+                    if not contras:
+                        del counts[word]
+
+    def update(self, entries):
+        """Index the transactions added since the last update, unindex the removed ones.
+
+        Returns:
+          True if the index changed.
+        """
+        keys = collections.Counter()
+        for entry in entries:
+            if isinstance(entry, data.Transaction):
+                key = _key(entry)
+                if key is not None:
+                    keys[key] += 1
+        changed = False
+        for key in keys.keys() | self.keys.keys():
+            delta = keys[key] - self.keys[key]
+            if delta:
+                self._add(key, delta)
+                changed = True
+        self.keys = keys
+        return changed
+
+    def predict(self, account, words):
+        """Predict the contra account of a transaction.
+
+        Each token votes for the contra accounts of the transactions it
+        appears in, in proportion of their number, the tokens appearing
+        with fewer contra accounts weighing more.
+
+        Args:
+          account: The account of the posting of the transaction.
+          words: The tokens of the transaction.
+        Returns:
+          An (account, confidence) tuple, or None.
+        """
+        counts = self.accounts.get(account)
+        if not counts:
+            return None
+        scores = collections.Counter()
+        for word in words:
+            contras = counts.get(word)
+            if not contras:
+                continue
+            weight = 1.0 / (sum(contras.values()) * len(contras))
+            for contra, count in contras.items():
+                scores[contra] += count * weight
+        if not scores:
+            return None
+        contra, score = scores.most_common(1)[0]
+        return contra, score / sum(scores.values())
+
+
+class Predict:
+    """Pipeline stage adding the predicted contra posting to transactions.
+
+    Args:
+      directory: Directory in which the index is stored, or None to
+        build it on every run.
+      min_confidence: Minimum confidence of the predictions to add.
+      flag: Flag of the predicted postings.
+    """
+
+    def __init__(self, directory=CACHEDIR, min_confidence=MIN_CONFIDENCE, flag='!'):
+        self.directory = directory
+        self.min_confidence = min_confidence
+        self.flag = flag
+        self._index = Index()
+
+    def _load(self, ledger_entries):
+        filenames = sorted({entry.meta.get('filename') for entry in ledger_entries} - {None})
+        name = hashlib.sha256(repr(filenames).encode()).hexdigest() + '.pickle'
+        filepath = path.join(self.directory, name)
+        index = None
+        try:
+            with open(filepath, 'rb') as fd:
+                index = pickle.load(fd)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+        if not isinstance(index, Index) or index.version != VERSION:
+            index = Index()
+
+        if index.update(ledger_entries):
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmppath = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as tmp:
+                pickle.dump(index, tmp, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmppath, filepath)
+        return index
+
+    def prepare(self, ledger_entries, streaming=False):
+        """Bring the index up to date with the existing ledger, once per run."""
+        ledger_entries = ledger_entries or []
+        if self.directory is None or not ledger_entries:
+            self._index = Index()
+            self._index.update(ledger_entries)
+        else:
+            self._index = self._load(ledger_entries)
+
+    def __call__(self, entries):
+        index = self._index
+        for entry in entries:
+            if (isinstance(entry, data.Transaction) and len(entry.postings) == 1
+                    and not entry.meta.get(extract.DUPLICATE)):
+                prediction = index.predict(entry.postings[0].account,
+                                           tokens(entry.payee, entry.narration))
+                if prediction is not None:
+                    account, confidence = prediction
+                    confidence = Decimal(confidence).quantize(Decimal('0.01'))
+                    if confidence >= self.min_confidence:
+                        posting = data.Posting(account, None, None, None, self.flag,
+                                               {CONFIDENCE: confidence})
+                        entry = entry._replace(postings=entry.postings + [posting])
+            yield entry
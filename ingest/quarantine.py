@@ -0,0 +1,158 @@
+"""Quarantine of the rows the importers cannot parse.
+
+A row whose description no narration parser recognizes, or whose date
+or amount does not parse, aborts the extraction of its whole document.
+With the --tolerant option of the extract command the importers drop
+such rows instead and extract all the others. The dropped rows are
+appended to a JSON lines file, one record per row with the importer,
+the document, the line number, the header and the raw columns of the
+row and the error, and the run ends with a summary of them.
+
+The extract-quarantined command extracts the quarantined rows again,
+once the importers learned to parse them: the rows of each document
+are written to a small document of their own, in the format of the
+importer, so only these rows are parsed. The rows that still fail stay
+in the file.
+
+Like the metrics, the rows are collected per process while enabled and
+the worker processes send theirs back with the results.
+"""
+import collections
+import csv
+import json
+import os
+import tempfile
+from os import path
+
+from ingest import watermarks
+
+
+# Default location of the quarantine file.
+FILENAME = path.join(watermarks.STATEDIR, 'quarantine.jsonl')
+
+# Fields of a record identifying the row.
+KEY = ('importer', 'filename', 'lineno', 'row')
+
+
+# The rows quarantined in the current process, None while not enabled.
+current = None
+
+
+def enable():
+    """Start quarantining the rows that do not parse in this process."""
+    global current
+    current = []
+    return current
+
+
+def pending():
+    """The number of rows quarantined in this process so far."""
+    return len(current) if current is not None else 0
+
+
+def add(importer, filename, lineno, header, row, error):
+    """Quarantine a row.
+
+    Args:
+      importer: The name of the importer.
+      filename: Filesystem path to the document.
+      lineno: The line number of the row in the document.
+      header: The list of column names of the document, or None.
+      row: The list of the raw values of the row.
+      error: The exception parsing the row raised.
+    """
+    current.append({'importer': importer, 'filename': filename, 'lineno': lineno,
+                    'header': header, 'row': row, 'error': str(error)})
+
+
+def drain():
+    """Return the rows quarantined in this process so far and start afresh."""
+    global current
+    if current is None:
+        return None
+    records, current = current, []
+    return records
+
+
+def _key(record):
+    return tuple(json.dumps(record[field]) for field in KEY)
+
+
+def load(filename=FILENAME):
+    """Load the quarantined rows.
+
+    Returns:
+      A list of records.
+    """
+    try:
+        with open(filename) as fd:
+            return [json.loads(line) for line in fd if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def save(records, filename=FILENAME):
+    """Replace the quarantined rows."""
+    directory = path.dirname(filename)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmppath = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp:
+        for record in records:
+            tmp.write(json.dumps(record, ensure_ascii=False) + '\n')
+    os.replace(tmppath, filename)
+
+
+def merge(records, filename=FILENAME):
+    """Add rows to the quarantine, replacing the earlier records of the same rows.
+
+    Returns:
+      The number of rows quarantined afresh.
+    """
+    merged = {_key(record): record for record in load(filename)}
+    before = len(merged)
+    merged.update((_key(record), record) for record in records)
+    save(list(merged.values()), filename)
+    return len(merged) - before
+
+
+def summary(records):
+    """Count the quarantined rows by importer.
+
+    Returns:
+      A list of (importer, rows, documents) tuples.
+    """
+    rows = collections.Counter()
+    documents = collections.defaultdict(set)
+    for record in records:
+        rows[record['importer']] += 1
+        documents[record['importer']].add(record['filename'])
+    return [(name, count, len(documents[name])) for name, count in sorted(rows.items())]
+
+
+def documents(records):
+    """Group the quarantined rows by importer and document, in order."""
+    groups = {}
+    for record in records:
+        groups.setdefault((record['importer'], record['filename']), []).append(record)
+    return groups
+
+
+def write(importer, records, directory):
+    """Write quarantined rows as a document of their own.
+
+    Args:
+      importer: The csvbase importer the rows are from.
+      records: The records of rows of the same document.
+      directory: The directory to write the document to.
+    Returns:
+      The path of the document and the line number of its first row.
+    """
+    filepath = path.join(directory, path.basename(records[0]['filename']))
+    header = records[0]['header']
+    with open(filepath, 'w', encoding=importer.encoding, newline='') as fd:
+        fd.write('\n' * int(importer.skiplines))
+        writer = csv.writer(fd, dialect=importer.dialect or 'excel')
+        if header is not None:
+            writer.writerow(header)
+        writer.writerows(record['row'] for record in records)
+    return filepath, int(importer.skiplines) + (header is not None) + 1
@@ -0,0 +1,102 @@
+"""Streaming extraction of large documents.
+
+The extract command holds the entries of all documents in memory: they
+are sorted and passed through the hooks as lists before being written.
+In streaming mode each document is extracted, processed and written an
+entry at a time instead, so the memory used does not grow with the
+number of rows of the documents:
+
+- importers with a stream() method yield the entries as they read the
+  document, the others extract the whole document at once,
+
+- hooks with prepare() and run() methods, like Pipeline, process the
+  entries lazily, the others get the entries of each document as a list,
+
+- the entries are written as they come out of the hooks.
+
+The documents are written in the order in which they are found, not
+sorted by date, and the entries of each document in the order of its
+rows. Duplicates are found against the existing ledger only, not
+against the entries of the earlier documents of the run.
+"""
+import textwrap
+
+from beancount.core import data
+from beancount.parser import printer
+from beangulp import extract as _extract
+
+from ingest import watermarks
+
+
+def extract(importer, filename, existing_entries):
+    """Extract the entries of a document lazily.
+
+    Args:
+      importer: The importer instance to handle the document.
+      filename: Filesystem path to the document.
+      existing_entries: Existing entries.
+    Returns:
+      An iterator over the extracted directives.
+    """
+    stream = getattr(importer, 'stream', None)
+    if stream is None:
+        return iter(_extract.extract_from_file(importer, filename, existing_entries))
+    return _checked(stream(filename, existing_entries))
+
+
+def _checked(entries):
+    for entry in entries:
+        data.sanity_check_types(entry)
+        yield entry
+
+
+def prepare(hooks, existing_entries):
+    """Prepare the streaming hooks for a run."""
+    for func in hooks:
+        if hasattr(func, 'run'):
+            func.prepare(existing_entries, streaming=True)
+
+
+def process(hooks, filename, entries, account, importer, existing_entries):
+    """Run the hooks over the entries of a document.
+
+    Returns:
+      An iterator over the processed directives.
+    """
+    for func in hooks:
+        run = getattr(func, 'run', None)
+        if run is not None:
+            entries = run(entries)
+            continue
+        processed = func([(filename, list(entries), account, importer)], existing_entries)
+        entries = iter(processed[0][1] if processed else [])
+    return entries
+
+
+def advancing(marks, account, entries):
+    """Yield the entries, moving the watermark of account past each one."""
+    for entry in entries:
+        yield entry
+        watermarks.advance(marks, account, (entry, ))
+
+
+def write(filename, entries, output):
+    """Write the entries of a document as they come.
+
+    The section is formatted like beangulp's print_extracted_entries()
+    does, duplicates are commented out.
+    """
+    output.write(_extract.SECTION.format(filename) + '\n\n')
+    for entry in entries:
+        duplicate = entry.meta.pop(_extract.DUPLICATE, False)
+        string = printer.format_entry(entry)
+        if duplicate:
+            if isinstance(duplicate, type(entry)):
+                source = duplicate.meta.get('filename')
+                lineno = duplicate.meta.get('lineno')
+                if source and lineno:
+                    output.write(f'; duplicate of {source}:{lineno}\n')
+            string = textwrap.indent(string, '; ')
+        output.write(string)
+        output.write('\n')
+    output.write('\n')
@@ -0,0 +1,117 @@
+"""Per-account watermarks of the imported rows.
+
+Exports downloaded from the banks usually overlap the previous ones.
+The watermark of an account records the latest booking date imported
+for it and the ids of the rows imported on that date. Importers
+supporting watermarks skip the rows dated before the watermark, and
+the already seen rows dated on it, as they read the document, so
+these rows are never parsed any further.
+
+The id of a row is the transaction id of the bank where the export has
+one, else a hash of the raw row. The importers store it in the ROWID
+metadata of the transactions, which is not printed. The extract
+command advances the watermarks from it once the entries are written,
+only when asked to with --commit-watermarks, so a preview of the
+entries does not make the next run skip them.
+"""
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+from os import path
+from typing import NamedTuple, Tuple
+
+from beancount.core import data
+
+
+# Default location of the watermarks file.
+STATEDIR = path.join(os.environ.get('XDG_STATE_HOME') or path.expanduser('~/.local/state'),
+                     'beancount-support')
+FILENAME = path.join(STATEDIR, 'watermarks.json')
+
+# Metadata key of the row id of a transaction.
+ROWID = '__rowid__'
+
+
+class Watermark(NamedTuple):
+    """The latest imported date of an account and the rows seen on it."""
+    date: datetime.date
+    ids: Tuple[str, ...]
+
+    def covers(self, date, rowid):
+        """Tell whether a row was imported already."""
+        return date < self.date or (date == self.date and rowid in self.ids)
+
+
+def rowid(row, transaction_id=None):
+    """Return the id of a row.
+
+    Args:
+      row: The tuple of the raw values of the row.
+      transaction_id: The transaction id of the bank, if any.
+    Returns:
+      A string.
+    """
+    if transaction_id:
+        return transaction_id
+    return hashlib.sha1('\x1f'.join(row).encode()).hexdigest()
+
+
+def load(filename=FILENAME):
+    """Load the watermarks.
+
+    Returns:
+      A dict mapping account names to Watermark instances.
+    """
+    try:
+        with open(filename) as fd:
+            state = json.load(fd)
+    except (OSError, ValueError):
+        return {}
+    return {account: Watermark(datetime.date.fromisoformat(mark['date']), tuple(mark['ids']))
+            for account, mark in state.items()}
+
+
+def save(watermarks, filename=FILENAME):
+    """Store the watermarks.
+
+    Args:
+      watermarks: A dict mapping account names to Watermark instances.
+    """
+    directory = path.dirname(filename)
+    os.makedirs(directory, exist_ok=True)
+    state = {account: {'date': mark.date.isoformat(), 'ids': list(mark.ids)}
+             for account, mark in sorted(watermarks.items())}
+    fd, tmppath = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp:
+        json.dump(state, tmp, indent=2)
+    os.replace(tmppath, filename)
+
+
+def advance(watermarks, account, entries):
+    """Move the watermarks past the rows of some entries.
+
+    Args:
+      watermarks: A dict mapping account names to Watermark instances,
+        updated in place.
+      account: The account the entries were imported into.
+      entries: The extracted directives. The rows are tracked by the
+        account of the first posting of their transaction, which is
+        account but for the documents with an account column.
+    """
+    found = {}
+    for entry in entries:
+        if not isinstance(entry, data.Transaction) or ROWID not in entry.meta:
+            continue
+        key = entry.postings[0].account if entry.postings else account
+        state = found.get(key)
+        if state is None:
+            mark = watermarks.get(key)
+            state = found[key] = [mark.date, set(mark.ids)] if mark else [None, set()]
+        if state[0] is None or entry.date > state[0]:
+            state[0], state[1] = entry.date, set()
+        if entry.date == state[0]:
+            state[1].add(entry.meta[ROWID])
+    for key, (date, ids) in found.items():
+        watermarks[key] = Watermark(date, tuple(sorted(ids)))
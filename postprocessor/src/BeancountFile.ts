@@ -21,10 +21,12 @@ class BeancountFile implements IBeancountFile {
   }
 
   constructor(file: string) {
+    // keep the indentation, it tells the transaction start lines from
+    // the metadata and postings that belong to them
     const fileSplit = file
       .split('\n')
-      .map((l) => l.trim())
-      .filter((l) => !l.startsWith(';')) // remove lines that are comments
+      .map((l) => l.trimEnd())
+      .filter((l) => !l.trim().startsWith(';')) // remove lines that are comments
       .filter((l) => l.length !== 0) // remove empty lines
 
     let currentBlock = null
@@ -32,6 +34,8 @@ class BeancountFile implements IBeancountFile {
     for (let line of fileSplit) {
       if (line.startsWith('****')) {
         // start of block
+        this.finishTransaction(transactionBuilding)
+        transactionBuilding = false
         currentBlock = line as TransactionsBlock
         this.blocks.add(currentBlock)
         continue
@@ -41,34 +45,64 @@ class BeancountFile implements IBeancountFile {
         throw new Error('Expected to start with a transactionblock (****)')
       }
 
-      // no transaction being build
-      if (!transactionBuilding) {
+      // not indented, start of the next transaction
+      if (!/^\s/.test(line)) {
+        this.finishTransaction(transactionBuilding)
         transactionBuilding = this.parseTransactionStartLine(line, currentBlock)
         continue
       }
 
-      // transaction being build, add the posting
-      const posting = this.stringToPosting(line)
-      transactionBuilding.postings.push(posting)
+      if (!transactionBuilding) {
+        throw new Error(`Expected a transaction start before "${line.trim()}"`)
+      }
 
-      // add meta info
-      const metaInfo = posting.line.match(/(-?\d*\.?\d*) (\w*)/)
-      if (!metaInfo) {
-        throw new Error(`Could not amount & currency from "${posting.line}"`)
+      // metadata of the transaction, like transaction_id: "...", or,
+      // after its postings, of the last posting, like confidence: 0.9
+      if (/^\s+[a-z][\w-]*:\s/.test(line)) {
+        const lastPosting = transactionBuilding.postings.at(-1)
+        if (lastPosting) {
+          lastPosting.metadata = [...(lastPosting.metadata ?? []), line.trim()]
+        } else {
+          transactionBuilding.metadata.push(line.trim())
+        }
+        continue
       }
-      const [, amount, currency] = metaInfo
-
-      // we've finished building the transaction
-      this.transactions.push({
-        ...transactionBuilding,
-        meta: {
-          account: posting.account,
-          amount: new Decimal(amount),
-          currency: currency as Currency,
-        },
-      })
-      transactionBuilding = false
+
+      // transaction being build, add the posting
+      transactionBuilding.postings.push(this.stringToPosting(line.trim()))
+    }
+    this.finishTransaction(transactionBuilding)
+  }
+
+  private finishTransaction(
+    transactionBuilding: Omit<Transaction, 'meta'> | false,
+  ) {
+    if (!transactionBuilding) {
+      return
+    }
+    if (transactionBuilding.postings.length === 0) {
+      throw new Error(
+        `Transaction "${transactionBuilding.payee}" has no postings`,
+      )
     }
+
+    // add meta info, from the posting of the imported account
+    const [posting] = transactionBuilding.postings
+    const metaInfo = posting.line.match(/(-?\d*\.?\d*) (\w*)/)
+    if (!metaInfo) {
+      throw new Error(`Could not amount & currency from "${posting.line}"`)
+    }
+    const [, amount, currency] = metaInfo
+
+    // we've finished building the transaction
+    this.transactions.push({
+      ...transactionBuilding,
+      meta: {
+        account: posting.account,
+        amount: new Decimal(amount),
+        currency: currency as Currency,
+      },
+    })
   }
 
   private parseTransactionStartLine(
@@ -93,20 +127,21 @@ class BeancountFile implements IBeancountFile {
       flags: new Set(flags.split('')),
       payee,
       narration,
+      metadata: [],
       postings: [],
     } as Omit<Transaction, 'meta'>
   }
 
   stringToPosting(line: string) {
-    const regexResult = line.match(/^(\w*:[\w:]*) *(.*)$/)
+    const regexResult = line.match(/^(?:([*!]) +)?(\w*:[\w:]*) *(.*)$/)
     if (!regexResult) {
       throw new Error(`Coult not parse line as posting "${line}"`)
     }
 
-    const [, account, rest] = regexResult
+    const [, flag, account, rest] = regexResult
 
     return {
-      flag: null,
+      flag: flag ?? null,
       account: account as PostingAccount,
       line: rest.trim(),
     } as Posting
@@ -128,8 +163,18 @@ class BeancountFile implements IBeancountFile {
             : ''
           outputLines.push(`${date} ${flags} ${payee} ${narration}`.trim())
 
+          transaction.metadata.forEach((metadata) => {
+            outputLines.push(`  ${metadata}`)
+          })
+
           transaction.postings.forEach((posting) => {
-            outputLines.push(`  ${posting.account}     ${posting.line}`)
+            const flag = posting.flag ? `${posting.flag} ` : ''
+            outputLines.push(
+              `  ${flag}${posting.account}     ${posting.line}`.trimEnd(),
+            )
+            posting.metadata?.forEach((metadata) => {
+              outputLines.push(`    ${metadata}`)
+            })
           })
 
           outputLines.push('') // empty line
@@ -319,6 +319,10 @@ const interactiveMenuFlow = async (db: Db) => {
 const processFileFlow = async (db: Db, fileLocation: string) => {
   const beancountFile = await BeancountFile.createFromFile(fileLocation)
   for (let transaction of beancountFile.transactions) {
+    // already has its other postings, from import.py or a prediction
+    if (transaction.postings.length > 1) {
+      continue
+    }
     const matchedAutoPostingMatcher = db.matchTransaction(transaction)
     if (matchedAutoPostingMatcher) {
       matchedAutoPostingMatcher.postings.forEach((posting) => {
@@ -10,6 +10,7 @@ export interface Posting {
   flag: string | null
   account: PostingAccount
   line: PostingLine
+  metadata?: string[] // key: value lines, as in the file
 }
 
 export interface Transaction {
@@ -18,6 +19,7 @@ export interface Transaction {
   flags: Set<string>
   payee: string
   narration: string
+  metadata: string[] // key: value lines, as in the file
   postings: Posting[]
   meta: {
     amount: Decimal
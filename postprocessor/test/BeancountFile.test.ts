@@ -0,0 +1,79 @@
+import assert from 'node:assert/strict'
+import fs from 'node:fs/promises'
+import { test } from 'node:test'
+import BeancountFile from '../src/BeancountFile.js'
+
+const FIXTURE = new URL('./fixtures/extract.beancount', import.meta.url)
+
+test('parses the output of import.py extract', async () => {
+  const beancountFile = await BeancountFile.createFromFile(FIXTURE.pathname)
+
+  assert.equal(beancountFile.blocks.size, 2)
+  // the duplicate is commented out
+  assert.equal(beancountFile.transactions.length, 6)
+
+  const incasso = beancountFile.transactions.find(
+    (t) => t.payee === 'Energie BV, Termijn 1',
+  )!
+  assert.deepEqual(incasso.metadata, [
+    'iban: "NL02RABO"',
+    'bic: "RABONL2U"',
+    'reference: "E123"',
+    'creditor_id: "NL00ZZZ"',
+    'mandate: "123"',
+  ])
+  assert.equal(incasso.postings.length, 1)
+  assert.equal(incasso.meta.account, 'Assets:NL:ABN:Checking')
+  assert.equal(incasso.meta.amount.toString(), '-82.7')
+  assert.equal(incasso.meta.currency, 'EUR')
+
+  const predicted = beancountFile.transactions.find((t) =>
+    t.payee.startsWith('Albert Heijn'),
+  )!
+  assert.deepEqual(predicted.postings.at(-1), {
+    flag: '!',
+    account: 'Expenses:Groceries',
+    line: '',
+    metadata: ['confidence: 1.00'],
+  })
+  assert.equal(predicted.meta.amount.toString(), '-93.39')
+
+  const rent = beancountFile.transactions.find(
+    (t) => t.payee === 'J DOE, Huur januari',
+  )!
+  assert.deepEqual(
+    rent.postings.map(({ flag, account }) => ({ flag, account })),
+    [
+      { flag: null, account: 'Assets:NL:ABN:Checking' },
+      { flag: null, account: 'Expenses:Rent' },
+    ],
+  )
+  assert.equal(rent.metadata.length, 3)
+
+  const grabber = beancountFile.transactions.find((t) => t.payee === 'P1')!
+  assert.deepEqual(grabber.metadata, ['transaction_id: "rev1"'])
+  assert.equal(grabber.meta.account, 'Assets:NL:Revolut')
+})
+
+test('writes back what it parsed', async () => {
+  const beancountFile = await BeancountFile.createFromFile(FIXTURE.pathname)
+  const reparsed = new BeancountFile(beancountFile.toString())
+
+  assert.deepEqual(reparsed.blocks, beancountFile.blocks)
+  assert.deepEqual(
+    reparsed.transactions.map(({ payee, narration, metadata, postings }) => ({
+      payee,
+      narration,
+      metadata,
+      postings,
+    })),
+    beancountFile.transactions.map(
+      ({ payee, narration, metadata, postings }) => ({
+        payee,
+        narration,
+        metadata,
+        postings,
+      }),
+    ),
+  )
+})
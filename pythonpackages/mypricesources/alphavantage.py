@@ -10,6 +10,15 @@ does unfortunately not return in which ccy the result is.
 
 Valid tickers for exchangerates are in the form "fx:XXX:YYY", such as "fx:USD:CHF".
 
+Requests are rate limited to the quota of the API plan, which can be set
+in the environment variables "ALPHAVANTAGE_REQUESTS_PER_MINUTE" and
+"ALPHAVANTAGE_REQUESTS_PER_DAY" and defaults to the free plan. The
+quota is shared by all threads and all processes using this source.
+
+Historical prices are answered from a local copy of the daily series of
+the ticker. The full series is downloaded on the first lookup, later
+lookups past its end only download the missing tail, at most once a day.
+
 Here is the API documentation:
 https://www.alphavantage.co/documentation/
 
@@ -24,14 +33,43 @@ https://www.alphavantage.co/query?function=CURRENCY_EXCHANGE_RATE&from_currency=
 
 from decimal import Decimal
 
+import datetime
+import os
 import re
-from time import sleep
 import requests
 from dateutil.tz import tz
 from dateutil.parser import parse
 
 from beanprice import source
 
+from mypricesources import fetch
+from mypricesources import ratelimit
+from mypricesources import series
+
+
+# Endpoint of the API.
+URL = "https://www.alphavantage.co/query"
+
+# Directory holding the rate limiter state and the price series.
+CACHEDIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                        "mypricesources", "alphavantage")
+
+# Number of times a request is retried when the quota is reported exhausted.
+MAX_RETRIES = 3
+
+# Number of most recent days returned with outputsize=compact.
+COMPACT_SIZE = 100
+
+_limiter = ratelimit.TokenBucket(
+    os.path.join(CACHEDIR, "ratelimit"),
+    [
+        (int(os.environ.get("ALPHAVANTAGE_REQUESTS_PER_MINUTE", 5)), 60),
+        (int(os.environ.get("ALPHAVANTAGE_REQUESTS_PER_DAY", 25)), 24 * 60 * 60),
+    ],
+)
+
+_store = series.SeriesStore(os.path.join(CACHEDIR, "series"))
+
 
 class AlphavantageApiError(ValueError):
     "An error from the Alphavantage API."
@@ -54,13 +92,18 @@ def _parse_ticker(ticker):
 def _do_fetch(params):
     params["apikey"] = "XCQLW0WAZN37U2M7"
 
-    resp = requests.get(url="https://www.alphavantage.co/query", params=params)
-    data = resp.json()
-    # This is for dealing with the rate limit, sleep for 60 seconds and then retry
-    if "Note" in data:
-        sleep(60)
-        resp = requests.get(url="https://www.alphavantage.co/query", params=params)
+    for _ in range(MAX_RETRIES + 1):
+        if not _limiter.acquire():
+            raise AlphavantageApiError("daily quota exhausted")
+        resp = fetch.get(URL, params=params)
         data = resp.json()
+        # The quota was exhausted all the same, by requests not made through
+        # the limiter. Wait for the next token and retry.
+        if "Note" not in data:
+            break
+        _limiter.drain()
+    else:
+        raise AlphavantageApiError("Rate limit exceeded: {}".format(data["Note"]))
 
     if resp.status_code != requests.codes.ok:
         raise AlphavantageApiError(
@@ -73,6 +116,47 @@ def _do_fetch(params):
     return data
 
 
+def _field(data, key):
+    """Return a field of a response, or raise the message the API sent instead."""
+    value = data.get(key)
+    if not value:
+        # Unsupported plans are reported in an Information field, unknown
+        # symbols with an empty quote.
+        message = data.get("Information") or data
+        raise AlphavantageApiError("Invalid response, no {!r}: {}".format(key, message))
+    return value
+
+
+def _fetch_series(kind, symbol, base, outputsize):
+    """Fetch the daily closing prices of a ticker.
+
+    Returns:
+      A dict mapping datetime.date instances to prices.
+    """
+    if kind == "price":
+        params = {
+            "function": "TIME_SERIES_DAILY",
+            "symbol": symbol,
+            "outputsize": outputsize,
+        }
+        data = _do_fetch(params)
+        series_data = _field(data, "Time Series (Daily)")
+    else:
+        params = {
+            "function": "FX_DAILY",
+            "from_symbol": symbol,
+            "to_symbol": base,
+            "outputsize": outputsize,
+        }
+        data = _do_fetch(params)
+        series_data = _field(data, "Time Series FX (Daily)")
+
+    return {
+        datetime.date.fromisoformat(date): Decimal(values["4. close"])
+        for date, values in series_data.items()
+    }
+
+
 class Source(source.Source):
     def get_latest_price(self, ticker):
         kind, symbol, base = _parse_ticker(ticker)
@@ -84,7 +168,7 @@ class Source(source.Source):
             }
             data = _do_fetch(params)
 
-            price_data = data["Global Quote"]
+            price_data = _field(data, "Global Quote")
             price = Decimal(price_data["05. price"])
             date = parse(price_data["07. latest trading day"]).replace(tzinfo=tz.tzutc())
         else:
@@ -95,7 +179,7 @@ class Source(source.Source):
             }
             data = _do_fetch(params)
 
-            price_data = data["Realtime Currency Exchange Rate"]
+            price_data = _field(data, "Realtime Currency Exchange Rate")
             price = Decimal(price_data["5. Exchange Rate"])
             date = parse(price_data["6. Last Refreshed"]).replace(
                 tzinfo=tz.gettz(price_data["7. Time Zone"])
@@ -103,6 +187,35 @@ class Source(source.Source):
 
         return source.SourcePrice(price, date, base)
 
+    def get_latest_prices(self, tickers):
+        """Fetch the latest prices of many tickers concurrently.
+
+        Returns:
+          A dict mapping each ticker to its SourcePrice, or to None if
+          fetching it failed.
+        """
+        return fetch.batch(self.get_latest_price, tickers)
+
     def get_historical_price(self, ticker, time):
-        return None
+        kind, symbol, base = _parse_ticker(ticker)
+        date = time.date()
+        today = datetime.date.today()
+
+        with _store.lock(ticker):
+            prices = _store.load(ticker)
+            if prices.fetched != today and (not prices or prices.dates[-1] < date):
+                # Only the tail is missing if it fits in a compact response.
+                if prices and (today - prices.dates[-1]).days < COMPACT_SIZE:
+                    outputsize = "compact"
+                else:
+                    outputsize = "full"
+                prices = prices.merge(_fetch_series(kind, symbol, base, outputsize), today)
+                _store.save(ticker, prices)
+
+        found = prices.lookup(date)
+        if found is None:
+            return None
+        price_date, price = found
+        trade_time = datetime.datetime.combine(price_date, datetime.time(), tzinfo=tz.tzutc())
+        return source.SourcePrice(price, trade_time, base)
 
@@ -0,0 +1,98 @@
+"""HTTP plumbing shared by the price sources.
+
+All requests go through a single pooled requests.Session, so the
+connections to a host are reused between tickers and between the
+threads of a batch, and every request has a deadline, so a stalled
+server cannot hang a whole bean-price run.
+"""
+import logging
+import threading
+import time
+from concurrent import futures
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Seconds to wait for a connection to be established.
+CONNECT_TIMEOUT = 5
+
+# Seconds to wait for the server to send data.
+READ_TIMEOUT = 15
+
+# Seconds in which the whole response needs to have been received.
+DEADLINE = 30
+
+# Maximum number of concurrent requests of a batch.
+MAX_WORKERS = 8
+
+# Size of the chunks in which response bodies are read.
+CHUNK_SIZE = 64 * 1024
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session():
+    """Return the shared requests.Session."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=MAX_WORKERS)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def get(url, params=None, deadline=DEADLINE, **kwargs):
+    """Fetch a URL within a deadline.
+
+    Args:
+      url: The URL to fetch.
+      params: Optional query parameters.
+      deadline: Seconds in which the complete response needs to arrive.
+      kwargs: Other arguments for requests.Session.get().
+    Returns:
+      A requests.Response with the body read.
+    Raises:
+      requests.Timeout: If the deadline is exceeded.
+    """
+    end = time.monotonic() + deadline
+    response = session().get(url, params=params, stream=True,
+                             timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs)
+    with response:
+        chunks = []
+        for chunk in response.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+            if time.monotonic() > end:
+                raise requests.Timeout(f'Deadline of {deadline}s exceeded fetching {url}')
+        # Hand the body read here over to the response, as if requests
+        # had read it itself.
+        response._content = b''.join(chunks)
+    return response
+
+
+def batch(func, tickers, max_workers=MAX_WORKERS):
+    """Call a price fetching function for many tickers concurrently.
+
+    Args:
+      func: A function taking a ticker and returning a SourcePrice.
+      tickers: A list of tickers.
+      max_workers: Maximum number of concurrent calls.
+    Returns:
+      A dict mapping each ticker to its SourcePrice, or to None if
+      fetching it failed. The failures are logged.
+    """
+    results = {}
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tasks = {executor.submit(func, ticker): ticker for ticker in tickers}
+        for task in futures.as_completed(tasks):
+            ticker = tasks[task]
+            try:
+                results[ticker] = task.result()
+            except (ValueError, requests.RequestException) as exc:
+                logging.error("Error fetching %s: %s", ticker, exc)
+                results[ticker] = None
+    return results
@@ -1,62 +1,116 @@
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, List, Optional
+import functools
+import os
 import re
 
 import requests
-from bs4 import BeautifulSoup
 
 from beanprice import source
 
+from mypricesources import fetch
+from mypricesources import htmlscan
+from mypricesources import quotecache
+
+
+# Quote page of a ticker.
+URL = "https://markets.ft.com/data/funds/tearsheet/summary?s={ticker}:eur"
+
+_cache = quotecache.QuoteCache(
+    os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                 "mypricesources", "ft"))
+
 
 class FTError(ValueError):
     "An error from the Financial Times API."
 
 
+class _QuoteScanner(htmlscan.Scanner):
+    """Finds the price in the quote bar and the disclaimer with its date."""
+
+    def __init__(self):
+        super().__init__()
+        self.quote_bar = None
+        self.price_item = None
+        self.price_value = None
+        self.disclaimer = None
+        self.found = set()
+
+    def start(self, element):
+        if self.quote_bar is None:
+            if element.tag == 'ul' and 'mod-tearsheet-overview__quote__bar' in element.classes:
+                self.quote_bar = element
+        elif self.price_item is None:
+            if element.tag == 'li' and self.within(self.quote_bar):
+                self.price_item = element
+        elif self.price_value is None:
+            if (element.tag == 'span' and 'mod-ui-data-list__value' in element.classes
+                    and self.within(self.price_item)):
+                self.price_value = element
+                element.capture()
+        if self.disclaimer is None:
+            if element.tag == 'div' and 'mod-disclaimer' in element.classes:
+                self.disclaimer = element
+                element.capture()
+
+    def end(self, element):
+        if element is self.price_value or element is self.disclaimer:
+            self.found.add(element.tag)
+            if len(self.found) == 2:
+                raise htmlscan.Done()
+
+
+def _parse(ticker: str, text: str) -> source.SourcePrice:
+    """Extract the price from the page of a ticker."""
+    scanner = _QuoteScanner().scan(text)
+
+    if not scanner.quote_bar:
+        raise FTError(f"Could not find price data for ticker {ticker}")
+
+    # Extract price
+    if not scanner.price_item:
+        raise FTError(f"Could not find price element for ticker {ticker}")
+
+    if not scanner.price_value:
+        raise FTError(f"Could not find price value for ticker {ticker}")
+
+    price = Decimal(scanner.price_value.text.strip())
+
+    # Extract date
+    if not scanner.disclaimer:
+        raise FTError(f"Could not find date information for ticker {ticker}")
+
+    date_match = re.search(r'as of ([A-Za-z]+ \d{2} \d{4})', scanner.disclaimer.text)
+    if not date_match:
+        raise FTError(f"Could not parse date for ticker {ticker}")
+
+    trade_time = datetime.strptime(date_match.group(1), '%b %d %Y').replace(tzinfo=timezone.utc)
+
+    # Currency is always EUR based on the URL structure
+    currency = 'EUR'
+
+    return source.SourcePrice(price, trade_time, currency)
+
+
 class Source(source.Source):
     "Financial Times price extractor."
 
+    def get_latest_prices(self, tickers: List[str]) -> Dict[str, Optional[source.SourcePrice]]:
+        """Fetch the latest prices of many tickers concurrently.
+
+        Returns:
+          A dict mapping each ticker to its SourcePrice, or to None if
+          fetching it failed.
+        """
+        return fetch.batch(self.get_latest_price, tickers)
+
     def get_latest_price(self, ticker: str) -> Optional[source.SourcePrice]:
         """See contract in beanprice.source.Source."""
 
-        url = f"https://markets.ft.com/data/funds/tearsheet/summary?s={ticker}:eur"
+        url = URL.format(ticker=ticker)
 
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-            quote_bar = soup.find('ul', {'class': 'mod-tearsheet-overview__quote__bar'})
-
-            if not quote_bar:
-                raise FTError(f"Could not find price data for ticker {ticker}")
-
-            # Extract price
-            price_item = quote_bar.find('li')
-            if not price_item:
-                raise FTError(f"Could not find price element for ticker {ticker}")
-            
-            price_value = price_item.find('span', {'class': 'mod-ui-data-list__value'})
-            if not price_value:
-                raise FTError(f"Could not find price value for ticker {ticker}")
-            
-            price = Decimal(price_value.text.strip())
-
-            # Extract date
-            disclaimer = soup.find('div', {'class': 'mod-disclaimer'})
-            if not disclaimer:
-                raise FTError(f"Could not find date information for ticker {ticker}")
-            
-            date_match = re.search(r'as of ([A-Za-z]+ \d{2} \d{4})', disclaimer.text)
-            if not date_match:
-                raise FTError(f"Could not parse date for ticker {ticker}")
-
-            trade_time = datetime.strptime(date_match.group(1), '%b %d %Y').replace(tzinfo=timezone.utc)
-
-            # Currency is always EUR based on the URL structure
-            currency = 'EUR'
-
-            return source.SourcePrice(price, trade_time, currency)
-
+            return _cache.fetch(ticker, url, functools.partial(_parse, ticker))
         except requests.RequestException as exc:
             raise FTError(f"Failed to fetch data for {ticker}: {exc}") from exc
@@ -0,0 +1,113 @@
+"""Streaming extraction of a few values from a large HTML page.
+
+A Scanner is fed the page in chunks and keeps only the stack of the
+currently open elements, plus the text of the elements it was asked to
+capture. It stops parsing as soon as it has found everything it looks
+for, so the rest of the page is never tokenized and no document tree
+is ever built.
+"""
+import html.parser
+
+
+# Size of the chunks in which the page is fed to the parser.
+CHUNK_SIZE = 16 * 1024
+
+# Elements without content or end tag, never pushed on the stack.
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+])
+
+
+class Done(Exception):
+    "Raised by a scanner when it found everything it looks for."
+
+
+class Element:
+    """An open element.
+
+    Attributes:
+      tag: The lowercase tag name.
+      classes: The list of class names of the element.
+      parts: The list of text fragments of the element, if captured,
+        else None.
+    """
+    __slots__ = ('tag', 'classes', 'parts')
+
+    def __init__(self, tag, attrs):
+        self.tag = tag
+        self.classes = []
+        for name, value in attrs:
+            if name == 'class' and value:
+                self.classes = value.split()
+        self.parts = None
+
+    def capture(self):
+        """Collect the text of the element, including its descendants."""
+        self.parts = []
+
+    @property
+    def text(self):
+        return ''.join(self.parts or ())
+
+
+class Scanner(html.parser.HTMLParser):
+    """Base class of the early-exit page scanners.
+
+    Subclasses override start() and end(), which are called with each
+    element when it is opened and closed, call capture() on the
+    elements whose text they need and raise Done when they have seen
+    enough of the page.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+
+    def start(self, element):
+        pass
+
+    def end(self, element):
+        pass
+
+    def within(self, element):
+        """Tell whether an element is open."""
+        return any(open_element is element for open_element in self.stack)
+
+    def handle_starttag(self, tag, attrs):
+        element = Element(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(element)
+        self.start(element)
+
+    def handle_endtag(self, tag):
+        # Close the innermost element of this name and all elements left
+        # open inside it, like browsers do. Stray end tags are ignored.
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index].tag == tag:
+                break
+        else:
+            return
+        while len(self.stack) > index:
+            self.end(self.stack.pop())
+
+    def handle_data(self, data):
+        for element in self.stack:
+            if element.parts is not None:
+                element.parts.append(data)
+
+    def scan(self, text):
+        """Feed a page to the scanner until it is done or the page ends.
+
+        Args:
+          text: The text of the page.
+        Returns:
+          The scanner.
+        """
+        try:
+            for start in range(0, len(text), CHUNK_SIZE):
+                self.feed(text[start:start + CHUNK_SIZE])
+            self.close()
+        except Done:
+            pass
+        return self
@@ -1,59 +1,110 @@
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, List, Optional
+import functools
+import os
 import re
 
 import requests
-from bs4 import BeautifulSoup
 
 from beanprice import source
 
+from mypricesources import fetch
+from mypricesources import htmlscan
+from mypricesources import quotecache
+
+
+# Quote page of a ticker.
+URL = "https://www.morningstar.nl/nl/funds/snapshot/snapshot.aspx?id={ticker}"
+
+_cache = quotecache.QuoteCache(
+    os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                 "mypricesources", "morningstar"))
+
 
 class MorningstarError(ValueError):
     "An error from the Morningstar API."
 
 
-class Source(source.Source):
-    "Morningstar price extractor."
+class _KeyStatsScanner(htmlscan.Scanner):
+    """Collects the cells of the price row of the key stats table."""
 
-    def get_latest_price(self, ticker: str) -> Optional[source.SourcePrice]:
-        """See contract in beanprice.source.Source."""
+    def __init__(self):
+        super().__init__()
+        self.table = None
+        self.rows = 0
+        self.price_row = None
+        self.price_cells = []
 
-        url = f"https://www.morningstar.nl/nl/funds/snapshot/snapshot.aspx?id={ticker}"
+    def start(self, element):
+        if self.table is None:
+            if element.tag == 'table' and 'overviewKeyStatsTable' in element.classes:
+                self.table = element
+        elif element.tag == 'tr' and self.price_row is None and self.within(self.table):
+            self.rows += 1
+            # The price row is the first row after the header.
+            if self.rows == 2:
+                self.price_row = element
+        elif element.tag == 'td' and self.price_row is not None and self.within(self.price_row):
+            self.price_cells.append(element)
+            element.capture()
 
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
+    def end(self, element):
+        if element is self.price_row or element is self.table:
+            raise htmlscan.Done()
+
+
+def _parse(ticker: str, text: str) -> source.SourcePrice:
+    """Extract the price from the page of a ticker."""
+    scanner = _KeyStatsScanner().scan(text)
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-            table = soup.find('table', {'class': 'overviewKeyStatsTable'})
+    if not scanner.table:
+        raise MorningstarError(f"Could not find price data for ticker {ticker}")
 
-            if not table:
-                raise MorningstarError(f"Could not find price data for ticker {ticker}")
+    # Find the price row (first row after header)
+    price_cells = scanner.price_cells
+    if len(price_cells) < 3:
+        raise MorningstarError(f"Could not find price data for ticker {ticker}")
 
-            # Find the price row (first row after header)
-            price_row = table.find_all('tr')[1]
-            price_cells = price_row.find_all('td')
+    # Extract date and price
+    date_match = re.search(r'(\d{2}-\d{2}-\d{4})', price_cells[0].text)
+    if not date_match:
+        raise MorningstarError(f"Could not parse date for ticker {ticker}")
 
-            # Extract date and price
-            date_match = re.search(r'(\d{2}-\d{2}-\d{4})', price_cells[0].text)
-            if not date_match:
-                raise MorningstarError(f"Could not parse date for ticker {ticker}")
+    date_str = date_match.group(1)
+    trade_time = datetime.strptime(date_str, '%d-%m-%Y').replace(tzinfo=timezone.utc)
 
-            date_str = date_match.group(1)
-            trade_time = datetime.strptime(date_str, '%d-%m-%Y').replace(tzinfo=timezone.utc)
+    # Extract price and currency
+    price_text = price_cells[2].text.strip()
+    currency_match = re.match(r'([A-Z]{3})\s*([\d,\.]+)', price_text)
+    if not currency_match:
+        raise MorningstarError(f"Could not parse price for ticker {ticker}")
 
-            # Extract price and currency
-            price_text = price_cells[2].text.strip()
-            currency_match = re.match(r'([A-Z]{3})\s*([\d,\.]+)', price_text)
-            if not currency_match:
-                raise MorningstarError(f"Could not parse price for ticker {ticker}")
+    currency = currency_match.group(1)
+    price_str = currency_match.group(2).replace(',', '.')
+    price = Decimal(price_str)
 
-            currency = currency_match.group(1)
-            price_str = currency_match.group(2).replace(',', '.')
-            price = Decimal(price_str)
+    return source.SourcePrice(price, trade_time, currency)
 
-            return source.SourcePrice(price, trade_time, currency)
 
+class Source(source.Source):
+    "Morningstar price extractor."
+
+    def get_latest_prices(self, tickers: List[str]) -> Dict[str, Optional[source.SourcePrice]]:
+        """Fetch the latest prices of many tickers concurrently.
+
+        Returns:
+          A dict mapping each ticker to its SourcePrice, or to None if
+          fetching it failed.
+        """
+        return fetch.batch(self.get_latest_price, tickers)
+
+    def get_latest_price(self, ticker: str) -> Optional[source.SourcePrice]:
+        """See contract in beanprice.source.Source."""
+
+        url = URL.format(ticker=ticker)
+
+        try:
+            return _cache.fetch(ticker, url, functools.partial(_parse, ticker))
         except requests.RequestException as exc:
             raise MorningstarError(f"Failed to fetch data for {ticker}: {exc}") from exc
@@ -0,0 +1,117 @@
+"""On-disk cache of the prices scraped from quote pages.
+
+Fund prices are published at most once per business day, so a price
+scraped from a page stays current until the next business day after
+its quote date. Until then it is served from the cache without any
+request. After that the page is fetched again, with the validators of
+the previous response (ETag and Last-Modified) so a server supporting
+conditional requests can answer 304 Not Modified instead of sending
+and having us parse the whole page again.
+"""
+import datetime
+import json
+import os
+import tempfile
+import time
+from decimal import Decimal
+from os import path
+
+from beanprice import source
+
+from mypricesources import fetch
+
+
+# Minimum number of seconds a cached price is used without revalidation,
+# also when its quote date is long past, e.g. for a fund not priced daily.
+MIN_TTL = 3600
+
+
+def _expires(trade_time, now, min_ttl):
+    """Return the time a price quoted at trade_time is expected to change."""
+    date = trade_time.date() + datetime.timedelta(days=1)
+    while date.weekday() >= 5:
+        date += datetime.timedelta(days=1)
+    start = datetime.datetime.combine(date, datetime.time(), tzinfo=datetime.timezone.utc)
+    return max(start.timestamp(), now + min_ttl)
+
+
+class QuoteCache:
+    """A directory of cached prices, one file per ticker.
+
+    Args:
+      directory: The directory holding the cache files.
+      min_ttl: Minimum number of seconds a cached price is used.
+    """
+
+    def __init__(self, directory, min_ttl=MIN_TTL):
+        self.directory = directory
+        self.min_ttl = min_ttl
+
+    def _path(self, key):
+        return path.join(self.directory, key.replace(os.sep, '_') + '.json')
+
+    def _load(self, key):
+        try:
+            with open(self._path(key)) as fd:
+                return json.load(fd)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, key, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmppath = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as tmp:
+            json.dump(entry, tmp)
+        os.replace(tmppath, self._path(key))
+
+    def fetch(self, key, url, parse):
+        """Return the price of a quote page, from the cache if still current.
+
+        Args:
+          key: A string, the name of the cache entry, usually the ticker.
+          url: The URL of the quote page.
+          parse: A function taking the text of the page and returning
+            a SourcePrice.
+        Returns:
+          A SourcePrice.
+        Raises:
+          requests.RequestException: If fetching the page fails.
+        """
+        entry = self._load(key)
+        now = time.time()
+        if entry is not None and now < entry['expires']:
+            return _price(entry)
+
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = fetch.get(url, headers=headers)
+        if entry is not None and response.status_code == 304:
+            price = _price(entry)
+            etag = response.headers.get('ETag', entry.get('etag'))
+            last_modified = response.headers.get('Last-Modified', entry.get('last_modified'))
+        else:
+            response.raise_for_status()
+            price = parse(response.text)
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+        self._save(key, {
+            'price': str(price.price),
+            'time': price.time.isoformat(),
+            'currency': price.quote_currency,
+            'etag': etag,
+            'last_modified': last_modified,
+            'expires': _expires(price.time, now, self.min_ttl),
+        })
+        return price
+
+
+def _price(entry):
+    return source.SourcePrice(Decimal(entry['price']),
+                              datetime.datetime.fromisoformat(entry['time']),
+                              entry['currency'])
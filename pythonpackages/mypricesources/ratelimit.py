@@ -0,0 +1,110 @@
+"""Token bucket rate limiter shared between threads and processes.
+
+The state of the buckets is kept in a small JSON file, guarded by an
+exclusive lock on a lock file next to it, so the threads of one
+bean-price run and concurrently running bean-price processes all draw
+from the same quota.
+"""
+import contextlib
+import fcntl
+import json
+import os
+import threading
+import time
+from os import path
+
+
+class TokenBucket:
+    """A set of token buckets a request needs a token from each of.
+
+    Each bucket holds up to capacity tokens and is refilled at a rate of
+    capacity tokens per period. A quota of 5 requests per minute and 25
+    per day is expressed as the limits [(5, 60), (25, 86400)].
+
+    Args:
+      filepath: Path of the file holding the state of the buckets.
+      limits: A list of (capacity, period in seconds) pairs.
+    """
+
+    def __init__(self, filepath, limits):
+        self.filepath = filepath
+        self.limits = limits
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._lock:
+            os.makedirs(path.dirname(self.filepath), exist_ok=True)
+            fd = os.open(self.filepath + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    def _load(self, now):
+        """Return the current number of tokens in each bucket."""
+        try:
+            with open(self.filepath) as fd:
+                state = json.load(fd)
+            tokens, updated = state['tokens'], state['updated']
+            if len(tokens) != len(self.limits):
+                raise ValueError(tokens)
+        except (OSError, ValueError, KeyError):
+            return [float(capacity) for capacity, period in self.limits]
+
+        elapsed = max(0.0, now - updated)
+        return [min(float(capacity), count + elapsed * capacity / period)
+                for count, (capacity, period) in zip(tokens, self.limits)]
+
+    def _save(self, tokens, now):
+        tmppath = self.filepath + '.tmp'
+        with open(tmppath, 'w') as fd:
+            json.dump({'tokens': tokens, 'updated': now}, fd)
+        os.replace(tmppath, self.filepath)
+
+    def _take(self):
+        """Take a token if available, else return the seconds to wait for one."""
+        with self._locked():
+            now = time.time()
+            tokens = self._load(now)
+            wait = max((1.0 - count) * period / capacity
+                       for count, (capacity, period) in zip(tokens, self.limits))
+            if wait <= 0:
+                self._save([count - 1.0 for count in tokens], now)
+            return wait
+
+    def acquire(self, max_wait=None):
+        """Block until a token is available in every bucket and take it.
+
+        Args:
+          max_wait: Maximum number of seconds to wait for a token, by
+            default the shortest period, so an empty bucket with a long
+            period, like a daily quota, does not block for hours.
+        Returns:
+          True if a token was taken, False if it is not available within
+          max_wait seconds.
+        """
+        if max_wait is None:
+            max_wait = min(period for capacity, period in self.limits)
+        while True:
+            wait = self._take()
+            if wait <= 0:
+                return True
+            if wait > max_wait:
+                return False
+            time.sleep(wait)
+
+    def drain(self):
+        """Empty the buckets with the shortest period.
+
+        Used when the server reports the quota as exhausted anyway, for
+        example because of requests made by other clients.
+        """
+        with self._locked():
+            now = time.time()
+            tokens = self._load(now)
+            shortest = min(period for capacity, period in self.limits)
+            tokens = [0.0 if period == shortest else count
+                      for count, (capacity, period) in zip(tokens, self.limits)]
+            self._save(tokens, now)
@@ -0,0 +1,129 @@
+"""Local store of daily price series.
+
+Each series is kept in a small text file with one "date price" line
+per day, sorted by date, and a header line with the date the series
+was last fetched. Series are loaded once per process and looked up by
+bisection, so any number of historical price lookups can be answered
+from a single download of the series.
+"""
+import bisect
+import datetime
+import os
+import re
+import threading
+from decimal import Decimal
+from os import path
+
+
+class Series:
+    """A daily price series.
+
+    Attributes:
+      dates: A sorted list of datetime.date instances.
+      prices: A list of Decimal prices, one per date.
+      fetched: The datetime.date the series was last fetched, or None.
+    """
+
+    def __init__(self, dates=(), prices=(), fetched=None):
+        self.dates = list(dates)
+        self.prices = list(prices)
+        self.fetched = fetched
+
+    def __bool__(self):
+        return bool(self.dates)
+
+    def lookup(self, date):
+        """Find the price of a date.
+
+        Args:
+          date: A datetime.date instance.
+        Returns:
+          A (date, price) pair for the latest date of the series not
+          after the given one, or None if the series starts later.
+        """
+        index = bisect.bisect_right(self.dates, date)
+        if index == 0:
+            return None
+        return self.dates[index - 1], self.prices[index - 1]
+
+    def merge(self, points, fetched):
+        """Merge newly fetched points into the series.
+
+        Args:
+          points: A dict mapping datetime.date instances to prices. They
+            replace the prices the series has for the same dates.
+          fetched: The datetime.date the points were fetched.
+        Returns:
+          A new Series.
+        """
+        merged = dict(zip(self.dates, self.prices))
+        merged.update(points)
+        dates = sorted(merged)
+        return Series(dates, [merged[date] for date in dates], fetched)
+
+
+class SeriesStore:
+    """A directory of price series files.
+
+    Args:
+      directory: The directory holding the series files.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._series = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return path.join(self.directory, re.sub(r'[^\w.-]', '_', key) + '.series')
+
+    def lock(self, key):
+        """Return the lock serializing the updates of a series."""
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def load(self, key):
+        """Load a series, empty if it was never stored.
+
+        Args:
+          key: A string, the name of the series.
+        Returns:
+          A Series instance.
+        """
+        series = self._series.get(key)
+        if series is not None:
+            return series
+
+        dates, prices, fetched = [], [], None
+        try:
+            with open(self._path(key)) as fd:
+                header = fd.readline().split()
+                if header[:2] == ['#', 'fetched']:
+                    fetched = datetime.date.fromisoformat(header[2])
+                for line in fd:
+                    date, price = line.split()
+                    dates.append(datetime.date.fromisoformat(date))
+                    prices.append(Decimal(price))
+        except FileNotFoundError:
+            pass
+
+        series = self._series[key] = Series(dates, prices, fetched)
+        return series
+
+    def save(self, key, series):
+        """Store a series.
+
+        Args:
+          key: A string, the name of the series.
+          series: A Series instance.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        filepath = self._path(key)
+        tmppath = filepath + '.tmp'
+        with open(tmppath, 'w') as fd:
+            fd.write(f'# fetched {series.fetched.isoformat()}\n')
+            for date, price in zip(series.dates, series.prices):
+                fd.write(f'{date.isoformat()} {price}\n')
+        os.replace(tmppath, filepath)
+        self._series[key] = series
@@ -0,0 +1,32 @@
+from ingest.autopost import Rules
+
+
+def _regex(name, field, regex):
+    return {'name': name, 'matchType': 'regex',
+            'matchOptions': {'matchOn': field, 'regex': regex}}
+
+
+def _match(matchers, **values):
+    values = {'date': '2024-03-14', 'payee': '', 'narration': '', 'amount': '-2.50', **values}
+    rule = Rules(matchers).match(values)
+    return rule and rule.name
+
+
+def test_literal():
+    assert _match([_regex('coffee', 'payee', 'Coffee Company')],
+                  payee='The Coffee Company') == 'coffee'
+
+
+def test_first_rule_wins():
+    matchers = [_regex('first', 'narration', '^Es.*o$'), _regex('second', 'narration', '.*')]
+    assert _match(matchers, narration='Espresso') == 'first'
+    assert _match(matchers, narration='Latte') == 'second'
+
+
+def test_back_reference():
+    # Once combined with the first expression the group of the second
+    # one would be group 2, not 1.
+    matchers = [_regex('digits', 'narration', r'^(\d+)$'),
+                _regex('double', 'narration', r'^(\w)\1')]
+    assert _match(matchers, narration='llama') == 'double'
+    assert _match(matchers, narration='lama') is None
@@ -0,0 +1,49 @@
+import datetime
+from decimal import Decimal
+
+from beancount.core import data
+
+from ingest.dedup import Deduplicate
+
+
+DATE = datetime.date(2024, 3, 14)
+
+
+def _transaction(payee, narration, number='-2.50', date=DATE, **meta):
+    return data.Transaction(data.new_metadata('<test>', 0, meta), date, '*', payee, narration,
+                            data.EMPTY_SET, data.EMPTY_SET, [
+                                data.Posting('Assets:Checking',
+                                             data.Amount(Decimal(number), 'EUR'),
+                                             None, None, None, None),
+                            ])
+
+
+def test_same_day_same_amount_distinct():
+    existing = _transaction('Coffee Company', 'Espresso')
+    dedup = Deduplicate(directory=None)
+    dedup.prepare([existing])
+    assert dedup.find(_transaction('Bakery De Ster', 'Croissant')) is None
+
+
+def test_same_day_duplicate():
+    existing = _transaction('Coffee Company', 'Espresso')
+    dedup = Deduplicate(directory=None)
+    dedup.prepare([existing])
+    assert dedup.find(_transaction('COFFEE COMPANY', 'Espresso ')) is existing
+
+
+def test_same_day_preferred():
+    earlier = _transaction('Coffee Company', 'Espresso', date=DATE - datetime.timedelta(days=1))
+    existing = _transaction('Coffee Company', 'Espresso')
+    dedup = Deduplicate(directory=None)
+    dedup.prepare([earlier, existing])
+    assert dedup.find(_transaction('Coffee Company', 'Espresso')) is existing
+
+
+def test_duplicate_used_once():
+    existing = _transaction('Coffee Company', 'Espresso')
+    dedup = Deduplicate(directory=None)
+    dedup.prepare([existing])
+    entries = list(dedup([_transaction('Coffee Company', 'Espresso'),
+                          _transaction('Coffee Company', 'Espresso')]))
+    assert [entry.meta.get('__duplicate__') for entry in entries] == [existing, None]
@@ -0,0 +1,66 @@
+import csv
+import datetime
+
+from beancount.core import data
+
+from importers import grabber
+from ingest import watermarks
+
+
+# Rows of the accounts of three banks, with their bank transaction code.
+ROWS = [
+    ['ing1', '2024-05-01', '-2.50', 'EUR', 'Shop', 'Pasvolgnr: 001', 'Betaalautomaat',
+     'Assets.NL.ING.Checking'],
+    ['rev1', '2024-05-01', '-3.00', 'EUR', 'Shop', 'Shop', 'CARD_PAYMENT', 'Assets.NL.Revolut'],
+    ['ing2', '2024-05-02', '-4.00', 'EUR', 'Eneco',
+     'Naam: Eneco<br>Omschrijving: Termijn<br>IBAN: NL02<br>', 'Incasso',
+     'Assets.NL.ING.Checking'],
+    ['rev2', '2024-05-02', '10.00', 'EUR', 'J DOE', 'Top-up\nfrom card', 'TOPUP',
+     'Assets.NL.Revolut'],
+    ['abn1', '2024-05-03', '-5.00', 'EUR', 'Shop',
+     'SEPA Overboeking\nIBAN: NL12ABNA0123456789\nNaam: Shop\nOmschrijving: Bestelling 1\n'
+     'Kenmerk: 1', '944', 'Assets.NL.ABN.Gezamelijk'],
+]
+
+
+def _export(tmp_path):
+    filepath = tmp_path / 'grabber.csv'
+    with open(filepath, 'w', newline='') as fd:
+        writer = csv.writer(fd, lineterminator='\n')
+        writer.writerow(['id', 'date', 'amount', 'currency', 'payee', 'narration',
+                         'bankTransactionCode', 'account'])
+        writer.writerows(ROWS)
+    return str(filepath)
+
+
+def _extract(filepath, marks=None):
+    importer = grabber.Importer('Assets', 'EUR')
+    importer.watermarks = marks
+    entries = importer.extract(filepath, [])
+    return [entry for entry in entries if isinstance(entry, data.Transaction)]
+
+
+def test_accounts(tmp_path):
+    entries = _extract(_export(tmp_path))
+    assert [(entry.meta['transaction_id'], entry.postings[0].account, entry.narration)
+            for entry in entries] == [
+        ('ing1', 'Assets:NL:ING:Checking', ''),
+        ('rev1', 'Assets:NL:Revolut', 'Shop'),
+        ('ing2', 'Assets:NL:ING:Checking', 'Termijn'),
+        ('rev2', 'Assets:NL:Revolut', 'from card'),
+        ('abn1', 'Assets:NL:ABN:Gezamelijk', 'Bestelling 1'),
+    ]
+    assert entries[-1].meta['iban'] == 'NL12ABNA0123456789'
+
+
+def test_watermarks(tmp_path):
+    filepath = _export(tmp_path)
+    marks = {}
+    watermarks.advance(marks, 'Assets', _extract(filepath)[:3])
+    assert marks == {
+        'Assets:NL:ING:Checking': watermarks.Watermark(datetime.date(2024, 5, 2), ('ing2',)),
+        'Assets:NL:Revolut': watermarks.Watermark(datetime.date(2024, 5, 1), ('rev1',)),
+    }
+    # Each row is skipped by the watermark of its own account.
+    assert [entry.meta['transaction_id'] for entry in _extract(filepath, marks)] == [
+        'rev2', 'abn1']
@@ -0,0 +1,99 @@
+import pytest
+
+from importers import columns, ing, ing_from_grabber
+
+
+# Notifications of the ING CSV exports, with the payee and narration
+# the regular expressions the parsers replace made of them, and whether
+# a fallback parser of the transaction type matches.
+ING = [
+    (('iDEAL', 'Shop', 'Name: Shop Description: Shop order 12 IBAN: NL12INGB0001234567 '
+                       'Reference: 01-01-2024 12:00 123'),
+     ('Shop', 'order 12'), False),
+    (('SEPA direct debit', 'Energie BV', 'Name: Energie BV Description: Termijn 1 '
+                                         'IBAN: NL02RABO0123456789 Mandate ID: M1'),
+     ('Energie BV', 'Termijn 1'), False),
+    # The greedy groups run up to the last Description: and IBAN:.
+    (('Transfer', 'J DOE', 'Name: J DOE Description: Huur Description: januari '
+                           'IBAN: NL12 IBAN: NL13'),
+     ('J DOE Description: Huur', 'januari IBAN: NL12'), False),
+    (('Batch payment', 'Payroll', 'Name: Payroll BV Description: Salaris '
+                                  'IBAN: NL12INGB0001234567\nValue date: 01/01/2024'),
+     ('Payroll BV', 'Salaris'), False),
+    (('Online Banking', 'J DOE', 'Name: J DOE Description: Sparen IBAN: NL12INGB0001234567 '
+                                 'Value date: 01/01/2024'),
+     ('J DOE', 'Sparen'), False),
+    (('Online Banking', 'J DOE', 'To Oranje spaarrekening V1234 Value date: 01/01/2024'),
+     ('Oranje spaarrekening V1234', 'Value date: 01/01/2024'), True),
+    (('Online Banking', 'J DOE', 'From Oranje spaarrekening V1234 Value date: 01/01/2024'),
+     ('Oranje spaarrekening V1234', 'Value date: 01/01/2024'), True),
+    (('Various', 'Kosten OranjePakket', 'Period: 01/01/2024 - 31/01/2024'),
+     (None, 'Kosten OranjePakket'), False),
+    (('Payment terminal', 'Albert Heijn 1234', 'Card sequence no.: 001 12:00 Transaction: X'),
+     ('Albert Heijn 1234', 'Card sequence no.: 001 12:00 Transaction: X'), False),
+]
+
+ING_UNPARSED = [
+    ('iDEAL', 'Shop', 'Name: Shop Description: order 12'),
+    ('Online Banking', 'J DOE', 'Sparen'),
+    ('Unknown', 'X', 'Y'),
+]
+
+# Narrations of the csv-grabber exports of ING, with the narration the
+# regular expressions made of them.
+GRABBER = [
+    (('iDEAL', 'Naam: Shop<br>Omschrijving: Shop order 12<br>IBAN: NL12INGB0001234567<br>'
+               'Kenmerk: 01-01-2024 12:00 123'),
+     'order 12', False),
+    (('Incasso', 'Naam: Energie BV<br>Omschrijving: Termijn 1<br>IBAN: NL02RABO0123456789<br>'
+                 'Machtiging ID: M1'),
+     'Termijn 1', False),
+    (('Verzamelbetaling', 'Naam: Payroll BV<br>Omschrijving: Salaris<br>'
+                          'IBAN: NL12INGB0001234567<br>Valutadatum: 01-01-2024'),
+     'Salaris', False),
+    # The IBAN and the description as they are, unstripped.
+    (('Online bankieren', 'Naam: J DOE<br>Omschrijving: Sparen <br>IBAN: NL12INGB0001234567<br>'
+                          'Valutadatum: 01-01-2024'),
+     'NL12INGB0001234567 -  Sparen ', False),
+    (('Online bankieren', 'Naar Oranje spaarrekening V1234<br>Valutadatum: 01-01-2024'),
+     '', True),
+    (('Overschrijving', 'Van J DOE<br>Valutadatum: 01-01-2024'), '', True),
+    (('Overschrijving', 'Terugbetaling<br>Datum/Tijd: 01-01-2024 12:00<br>'
+                        'Valutadatum: 01-01-2024'),
+     'Terugbetaling', True),
+    (('Diversen', 'Kosten OranjePakket<br>Valutadatum: 01-01-2024'), 'Kosten OranjePakket', False),
+    (('Diversen', 'Kosten\nOranjePakket<br>Valutadatum: 01-01-2024'), 'OranjePakket', False),
+    (('Geldautomaat', 'ING AMSTERDAM<br>Pasvolgnr: 001<br>Datum/Tijd: 01-01-2024 12:00<br>'
+                      'Valutadatum: 01-01-2024'),
+     'ING AMSTERDAM<br>Pasvolgnr: 001', False),
+    (('Betaalautomaat', 'Albert Heijn 1234<br>Pasvolgnr: 001'), '', False),
+    (('Payment terminal', 'Albert Heijn 1234'), 'Albert Heijn 1234', False),
+]
+
+GRABBER_UNPARSED = [
+    ('iDEAL', 'Naam: Shop<br>Omschrijving: order 12'),
+    ('Diversen', 'Kosten OranjePakket'),
+    ('Unknown', 'X'),
+]
+
+
+@pytest.mark.parametrize('args, expected, fallback', ING)
+def test_ing(args, expected, fallback):
+    assert ing._parseIngNarration(*args) == (expected, fallback)
+
+
+@pytest.mark.parametrize('args', ING_UNPARSED)
+def test_ing_unparsed(args):
+    with pytest.raises(columns.ParseError):
+        ing._parseIngNarration(*args)
+
+
+@pytest.mark.parametrize('args, expected, fallback', GRABBER)
+def test_grabber(args, expected, fallback):
+    assert ing_from_grabber._parseIngNarration(*args) == (expected, fallback)
+
+
+@pytest.mark.parametrize('args', GRABBER_UNPARSED)
+def test_grabber_unparsed(args):
+    with pytest.raises(columns.ParseError):
+        ing_from_grabber._parseIngNarration(*args)
@@ -0,0 +1,74 @@
+import textwrap
+
+from beancount import loader
+
+from ingest import ledger
+
+
+def _write(filepath, text):
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    filepath.write_text(textwrap.dedent(text))
+
+
+def _transaction(date):
+    return f"""
+        {date} * "Coffee"
+          Assets:Checking  -2.50 EUR
+          Expenses:Coffee
+        """
+
+
+class _Counting(ledger.LedgerCache):
+    """A LedgerCache counting the ledgers loaded other than from the cache."""
+
+    loads = 0
+
+    def _load(self, filename, digests, globs):
+        self.loads += 1
+        return super()._load(filename, digests, globs)
+
+
+def _ledger(tmp_path, plugin=''):
+    _write(tmp_path / 'main.beancount', f"""
+        {plugin}
+        2024-01-01 open Assets:Checking
+        2024-01-01 open Expenses:Coffee
+        include "parts/*.beancount"
+        """)
+    _write(tmp_path / 'parts' / 'a.beancount', _transaction('2024-03-14'))
+    return str(tmp_path / 'main.beancount')
+
+
+def test_cached(tmp_path):
+    filename = _ledger(tmp_path)
+    cache = _Counting(str(tmp_path / 'cache'))
+    first = cache.load(filename)[0]
+    assert cache.load(filename)[0] == first
+    assert cache.loads == 1
+
+
+def test_file_added_to_include_glob(tmp_path):
+    filename = _ledger(tmp_path)
+    cache = _Counting(str(tmp_path / 'cache'))
+    cache.load(filename)
+    _write(tmp_path / 'parts' / 'b.beancount', _transaction('2024-03-15'))
+    entries = cache.load(filename)[0]
+    assert len(entries) == len(loader.load_file(filename)[0]) == 4
+    assert cache.loads == 2
+
+
+def test_plugin_changed(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    _write(tmp_path / 'coffeeplugin.py', """
+        __plugins__ = ['plugin']
+
+        def plugin(entries, options_map):
+            return entries, []
+        """)
+    filename = _ledger(tmp_path, plugin='plugin "coffeeplugin"')
+    cache = _Counting(str(tmp_path / 'cache'))
+    cache.load(filename)
+    with open(tmp_path / 'coffeeplugin.py', 'a') as fd:
+        fd.write('# Changed.\n')
+    cache.load(filename)
+    assert cache.loads == 2
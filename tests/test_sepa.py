@@ -0,0 +1,108 @@
+from importers import abn, abn_bv_from_grabber, abn_from_grabber, sepa
+
+
+# The descriptions of the CSV exports pad their fields to 32 characters.
+def _padded(*fields):
+    return ''.join(f'{field:<33}' for field in fields).strip()
+
+
+def _abn(description):
+    return abn.AbnDescription('Omschrijving').parse(description)
+
+
+def _grabber(transaction_type, narration):
+    parsed = abn_from_grabber.parseNarration(transaction_type, narration)
+    assert abn_bv_from_grabber.parseNarration(transaction_type, narration) == parsed
+    return parsed
+
+
+def test_tags():
+    fields = sepa.tokenize('/TRTP/SEPA Incasso algemeen doorlopend/CSID/NL00ZZZ/NAME/Energie BV'
+                           '/MARF/123/REMI/Termijn 1/IBAN/NL02RABO/BIC/RABONL2U/EREF/E123')
+    assert fields == {
+        'TRTP': 'SEPA Incasso algemeen doorlopend',
+        'CSID': 'NL00ZZZ',
+        'NAME': 'Energie BV',
+        'MARF': '123',
+        'REMI': 'Termijn 1',
+        'IBAN': 'NL02RABO',
+        'BIC': 'RABONL2U',
+        'EREF': 'E123',
+    }
+    assert sepa.metadata(fields) == {
+        'iban': 'NL02RABO',
+        'bic': 'RABONL2U',
+        'reference': 'E123',
+        'creditor_id': 'NL00ZZZ',
+        'mandate': '123',
+    }
+
+
+def test_tags_value_with_slash():
+    # The old regular expression cut the values at the first slash,
+    # into "J DOE, Factuur 2024".
+    assert _abn('/TRTP/SEPA OVERBOEKING/IBAN/NL12ABNA0123456789/BIC/ABNANL2A/NAME/J DOE'
+                '/REMI/Factuur 2024/12/EREF/E1/') == (
+        'J DOE, Factuur 2024/12',
+        {'iban': 'NL12ABNA0123456789', 'bic': 'ABNANL2A', 'reference': 'E1'})
+
+
+def test_keys():
+    assert _abn(_padded('SEPA Overboeking', 'IBAN: NL12ABNA0123456789', 'BIC: ABNANL2A',
+                        'Naam: J DOE', 'Omschrijving: Huur januari', 'Kenmerk: 123')) == (
+        'J DOE, Huur januari',
+        {'iban': 'NL12ABNA0123456789', 'bic': 'ABNANL2A', 'reference': '123'})
+
+
+def test_keys_without_kenmerk():
+    # The old regular expression required a Kenmerk and raised.
+    assert _abn(_padded('SEPA Overboeking', 'IBAN: NL12ABNA0123456789', 'BIC: ABNANL2A',
+                        'Naam: J DOE', 'Omschrijving: Huur januari')) == (
+        'J DOE, Huur januari', {'iban': 'NL12ABNA0123456789', 'bic': 'ABNANL2A'})
+
+
+def test_keys_unknown_key():
+    # Only the keys starting a line end the value, the other unknown
+    # keys are part of it, as with the old regular expression.
+    narration, meta = _abn(_padded('SEPA Overboeking', 'Naam: J DOE', 'Omschrijving: Huur',
+                                   'Betalingskenm.: 0123456789', 'Kenmerk: 123'))
+    assert narration == 'J DOE, Huur' + ' ' * 15 + 'Betalingskenm.: 0123456789'
+    assert meta == {'reference': '123'}
+
+
+def test_keys_value_with_colon():
+    assert sepa.tokenize('SEPA Overboeking Naam: J DOE Omschrijving: Factuur:12')['REMI'] == (
+        'Factuur:12')
+
+
+def test_grabber():
+    assert _grabber('944', 'SEPA Overboeking\nIBAN: NL12ABNA0123456789\nNaam: Shop\n'
+                           'Omschrijving: Bestelling 12\nKenmerk: 12') == (
+        'Bestelling 12', {'iban': 'NL12ABNA0123456789', 'reference': '12'})
+
+
+def test_grabber_wrapped_lines():
+    # The lines wrap at a fixed width, in the middle of words too.
+    assert _grabber('944', 'SEPA Overboeking\nNaam: Shop\nOmschrijving: Bestelling 12 voor de '
+                           'maand febr\nuari\nKenmerk: 12')[0] == (
+        'Bestelling 12 voor de maand februari')
+
+
+def test_grabber_unknown_key():
+    # The old regular expression did not match, the narration was
+    # "SEPA Overboeking".
+    assert _grabber('944', 'SEPA Overboeking\nNaam: Shop\nOmschrijving: Bestelling 12\n'
+                           'Betalingskenm.: 0123\nKenmerk: 12') == (
+        'Bestelling 12', {'reference': '12'})
+
+
+def test_bea():
+    # The old replacement was not a raw string, and replaced the letter
+    # after the comma with a control character: "1234, AS002" once the
+    # control characters were removed.
+    assert _abn(_padded('BEA, Betaalpas', 'Albert Heijn 1234,PAS002', 'NR:XXX01, 01.01.24/12:00',
+                        'AMSTERDAM')) == (
+        'Albert Heijn 1234, PAS002 NR:XXX01, 01.01.24/12:00 AMSTERDAM', None)
+    assert _grabber('999', 'BEA, Apple Pay\nAlbert Heijn 1,PAS002\nNR:00000001 01.02.24\n'
+                           'AMSTERDAM') == (
+        'Albert Heijn 1, PAS002, AMSTERDAM', None)